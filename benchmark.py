@@ -0,0 +1,240 @@
+"""Scaling benchmarks for the dispatch, storage and sizing models
+
+Generates synthetic instances of any length and fleet size from the shapes of the task
+load, wind and solar profiles and times model construction, solver I/O, solve and
+result extraction separately for:
+
+    task1_lp       dispatch LP of task 1
+    task2_battery  battery MILP of task 2
+    task4_nox      NOx-coupled LP of task 4
+    task9_sizing   unit sizing model of task 9 (exact MILP)
+    unit_commitment  dispatch with unit commitment (start-up costs, min up/down times),
+                     with unserved load and spilled power at VALUE_OF_LOST_LOAD
+
+Every run is appended to a JSON lines history file tagged with the git commit, so runs
+of different commits can be compared. Runs that stop before optimality (time limit) are
+recorded with optimal=false and no objective and left out of the comparison; an
+infeasible or unbounded case raises, as it is a broken instance rather than a slow one:
+
+    python benchmark.py --hours 24 168 8760 --units 4 40
+    python benchmark.py --compare
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+
+import numpy as np
+
+from extract import dispatch_array
+from models import build_battery_model, build_dispatch_model, build_sizing_model, build_unit_commitment_model
+from solver_select import default_solver, time_solver
+from task_data import LOAD_DEMAND, SOLAR, WIND
+
+HISTORY_FILE = "benchmark_history.jsonl"
+
+# Terminations that mean the instance is broken, not that the solver was too slow
+INVALID_TERMINATIONS = {"infeasible", "unbounded", "infeasibleOrUnbounded"}
+
+# Unit types the synthetic fleets cycle through:
+# fixed cost [EUR/h], variable cost [EUR/MWh], max limit [MW], CO2 and NOx [tons/MWh], profile
+UNIT_TYPES = {
+    "coal": (200, 60, 120, 1.5, 0.0, None),
+    "gas": (500, 100, 200, 0.2, 0.1, None),
+    "nuclear": (800, 120, 50, 0.0, 0.0, None),
+    "biomass": (1000, 150, 30, 0.0, 0.0, None),
+    "wind": (800, 40, 50, 0.0, 0.0, WIND),
+    "solar": (1000, 35, 30, 0.0, 0.0, SOLAR),
+}
+
+# Commitment data of the dispatchable unit types:
+# start-up cost [EUR], minimum stable output [share of max limit], min up and min down time [h]
+COMMITMENT_TYPES = {
+    "coal": (4000, 0.4, 8, 8),
+    "gas": (1000, 0.3, 2, 2),
+    "nuclear": (20000, 0.8, 24, 24),
+    "biomass": (2000, 0.4, 4, 4),
+}
+
+# [EUR/MWh] unserved load and spilled power of the unit commitment case: small fleets
+# cannot follow the night load with their minimum stable outputs and up/down times
+VALUE_OF_LOST_LOAD = 1000
+
+CASES = ("task1_lp", "task2_battery", "task4_nox", "task9_sizing", "unit_commitment")
+
+
+def profile(shape, hours, rng, noise=0.1):
+    """Repeat a 24 h profile over hours with multiplicative noise, scaled to a peak of 1"""
+    shape = np.asarray(shape, dtype=float)
+    values = np.resize(shape / shape.max(), hours)
+    return np.clip(values * rng.normal(1, noise, hours), 0, None)
+
+
+def synthetic_instance(hours=24, units=4, seed=0):
+    """Dispatch data with units units over hours hours, as keyword arguments of the model builders.
+
+    Units cycle through coal, gas, nuclear, biomass, wind and solar with costs and sizes
+    spread +-10% and +-50% around the task values; wind and solar follow the task profiles.
+    The load follows the task load profile with a peak at 80% of the dispatchable capacity.
+    """
+    rng = np.random.default_rng(seed)
+    kinds = list(UNIT_TYPES)
+    data = {key: {} for key in ("costs_fixed", "costs_variable", "max_limits", "co2_emissions", "nox_emissions")}
+    firm = 0.0
+    for i in range(units):
+        kind = kinds[i % len(kinds)]
+        fixed, variable, limit, co2, nox, shape = UNIT_TYPES[kind]
+        mode = f"{kind}{i // len(kinds)}"
+        capacity = limit * rng.uniform(0.5, 1.5) if units > len(UNIT_TYPES) else limit
+        data["costs_fixed"][mode] = fixed
+        data["costs_variable"][mode] = variable * rng.uniform(0.9, 1.1) if units > len(UNIT_TYPES) else variable
+        data["max_limits"][mode] = capacity if shape is None else capacity * profile(shape, hours, rng)
+        data["co2_emissions"][mode] = co2
+        data["nox_emissions"][mode] = nox
+        if shape is None:
+            firm += capacity
+    data["load_demand"] = 0.8 * firm * profile(LOAD_DEMAND, hours, rng, noise=0.05).clip(max=1)
+    return data
+
+
+def build_case(case, hours, units, seed=0):
+    """Return a function building the model of case on a synthetic instance"""
+    data = synthetic_instance(hours, units, seed)
+    load = data["load_demand"]
+    if case == "task1_lp":
+        return lambda: build_dispatch_model(load, data["costs_variable"], data["max_limits"],
+                                            costs_fixed=data["costs_fixed"])
+    if case == "task4_nox":
+        # Cap NOx at 125% of what is needed when the NOx-free units run at their limits
+        clean = sum(np.broadcast_to(limit, load.shape) for mode, limit in data["max_limits"].items()
+                    if data["nox_emissions"][mode] == 0)
+        nox_factor = min((nox for nox in data["nox_emissions"].values() if nox > 0), default=0)
+        nox_limit = 1.25 * nox_factor * np.clip(load - clean, 0, None).sum()
+        return lambda: build_dispatch_model(load, data["costs_variable"], data["max_limits"],
+                                            costs_fixed=data["costs_fixed"], co2_emissions=data["co2_emissions"],
+                                            cost_co2=60, nox_emissions=data["nox_emissions"],
+                                            nox_limit=nox_limit)
+    if case == "task2_battery":
+        rate = 0.1 * load.max()
+        costs_fixed = dict(data["costs_fixed"], battery=50)
+        costs_variable = dict(data["costs_variable"], battery=20)
+        max_limits = dict(data["max_limits"], battery=rate)
+        return lambda: build_battery_model(load, costs_variable, max_limits, costs_fixed=costs_fixed,
+                                           battery_rate_max=rate, battery_storage_max=4 * rate,
+                                           efficiency_ch=1.0, efficiency_disch=1.0)
+    if case == "task9_sizing":
+        # Renewable units are sized in blocks of a tenth of their capacity, up to 100 blocks
+        max_unit_counts = {mode: 1 if np.ndim(limit) == 0 else 100 for mode, limit in data["max_limits"].items()}
+        max_limits = {mode: limit if np.ndim(limit) == 0 else limit / 10 for mode, limit in data["max_limits"].items()}
+        return lambda: build_sizing_model(load, data["costs_variable"], max_limits, max_unit_counts,
+                                          costs_fixed=data["costs_fixed"], co2_emissions=data["co2_emissions"],
+                                          cost_co2=80)
+    if case == "unit_commitment":
+        commitment = {key: {} for key in ("startup_costs", "min_stable", "min_up", "min_down")}
+        for mode, limit in data["max_limits"].items():
+            kind = mode.rstrip("0123456789")
+            if kind in COMMITMENT_TYPES:
+                startup, stable, up, down = COMMITMENT_TYPES[kind]
+                commitment["startup_costs"][mode] = startup
+                commitment["min_stable"][mode] = stable * limit
+                commitment["min_up"][mode] = up
+                commitment["min_down"][mode] = down
+        return lambda: build_unit_commitment_model(load, data["costs_variable"], data["max_limits"],
+                                                   costs_fixed=data["costs_fixed"],
+                                                   value_of_lost_load=VALUE_OF_LOST_LOAD, **commitment)
+    raise ValueError(f"Unknown benchmark case {case}, expected one of {CASES}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases=CASES, hours=(24, 168, 8760), units=(4,), solver=None, time_limit=300, seed=0):
+    """Time every case for every instance size and return one record per run.
+
+    Records of runs that did not reach optimality have optimal=False and objective None.
+    Raises RuntimeError when a case is infeasible or unbounded.
+    """
+    import pyomo
+
+    commit = git_commit()
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    records = []
+    for case in cases:
+        model_type = {"task2_battery": "storage_milp", "task9_sizing": "sizing",
+                      "unit_commitment": "unit_commitment"}.get(case, "lp_dispatch")
+        case_solver = solver or default_solver(model_type)
+        for n_hours in hours:
+            for n_units in units:
+                record = time_solver(build_case(case, n_hours, n_units, seed), case_solver, time_limit,
+                                     extract=dispatch_array)
+                if record["termination"] in INVALID_TERMINATIONS:
+                    raise RuntimeError(f"Benchmark case {case} with hours={n_hours}, units={n_units} is "
+                                       f"{record['termination']}")
+                record["optimal"] = record["termination"] == "optimal"
+                if not record["optimal"]:
+                    record["objective"] = None
+                record.update(case=case, hours=n_hours, units=n_units, seed=seed, commit=commit,
+                              timestamp=timestamp, python=platform.python_version(), pyomo=pyomo.__version__)
+                records.append(record)
+    return records
+
+
+def save_history(records, path=HISTORY_FILE):
+    """Append benchmark records to the JSON lines history"""
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def load_history(path=HISTORY_FILE):
+    """The benchmark history as a DataFrame, one row per run"""
+    import pandas as pd
+
+    return pd.read_json(path, lines=True, dtype=False)
+
+
+def compare_commits(path=HISTORY_FILE, phase="total"):
+    """Median time of a phase per case and size (rows) and commit (columns), over the
+    runs that reached optimality"""
+    history = load_history(path)
+    history = history[history["objective"].notna()]
+    if phase == "total":
+        history["total"] = history[["build", "write", "solve", "load", "extract"]].sum(axis=1, min_count=1)
+    return history.pivot_table(index=["case", "hours", "units"], columns="commit", values=phase, aggfunc="median")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--hours", nargs="+", type=int, default=[24, 168, 8760])
+    parser.add_argument("--units", nargs="+", type=int, default=[4])
+    parser.add_argument("--solver", default=None, help="solver for all cases (default: solver_select.default_solver)")
+    parser.add_argument("--time-limit", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--compare", action="store_true", help="print the history per commit instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare_commits(args.history).to_string())
+        return
+
+    records = run_benchmarks(args.cases, args.hours, args.units, args.solver, args.time_limit, args.seed)
+    save_history(records, args.history)
+    for r in records:
+        print(f"{r['case']:14} hours={r['hours']:<5} units={r['units']:<4} {r['solver']:12} "
+              f"build={r['build']:.3f}s write={r['write']:.3f}s solve={r['solve']:.3f}s "
+              f"load={r['load']:.3f}s extract={r.get('extract', math.nan):.3f}s objective={r['objective']}"
+              + ("" if r["optimal"] else f" ({r['termination']})"))
+
+
+if __name__ == "__main__":
+    main()
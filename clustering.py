@@ -0,0 +1,229 @@
+"""Representative days for sizing runs over a whole year
+
+Task 9 sizes the plants against one day. Over a year the sizing model would have 8760
+hours per mode; instead the 365 daily profiles of the load and of the renewable
+limits (one row of features per day: the 24 hours of every series, each scaled by its
+yearly peak) are clustered with k-medoids into representative days. Every
+representative day is a real day of the year, weighted by the number of days in its
+cluster. Extreme days (the day with the load peak, the day with the least renewable
+production) are kept as representative days of their own, so the sizing still sees
+the hardest hours of the year.
+
+The sizing model (models.build_sizing_model) is built on the representative days with
+those weights, and its unit counts are checked against the full year by merit-order
+dispatch of every hour of the year:
+
+    result = solve_clustered_sizing(load, costs_variable, max_limits, max_unit_counts, k=12, ...)
+    result.unit_counts, result.objective, result.full_year_cost, result.error
+"""
+import time
+
+import numpy as np
+import pyomo.environ as pyo
+
+from dispatch_lp import hour_array
+from extract import values
+from fleet import Fleet
+from merit_order import merit_order_dispatch
+from models import build_sizing_model
+
+EXTREMES = ("peak_load", "min_renewable")
+
+
+class RepresentativeDays:
+    """Representative days of a year and the days each of them stands for"""
+
+    def __init__(self, days, weights, labels, hours_per_day=24):
+        self.days = days                    # day of the year of every representative day
+        self.weights = weights              # number of days every representative day stands for
+        self.labels = labels                # representative day (index into days) of every day of the year
+        self.hours_per_day = hours_per_day
+
+    @property
+    def hour_weights(self):
+        """Weight of every hour of the representative days, for build_sizing_model"""
+        return np.repeat(self.weights, self.hours_per_day).astype(float)
+
+    def select(self, series):
+        """The hours of the representative days of an hourly series (or hours x columns array)"""
+        series = np.asarray(series, dtype=float)
+        days = series.reshape((-1, self.hours_per_day) + series.shape[1:])
+        return days[self.days].reshape((-1,) + series.shape[1:])
+
+    def expand(self, series):
+        """A series over the representative hours repeated over the whole year"""
+        series = np.asarray(series, dtype=float)
+        days = series.reshape((-1, self.hours_per_day) + series.shape[1:])
+        return days[self.labels].reshape((-1,) + series.shape[1:])
+
+
+def daily_features(load_demand, profiles, hours_per_day=24):
+    """days x (hours_per_day * series) features: the hours of the load and of every profile
+    (hours x profiles array), each series scaled by its peak"""
+    series = np.column_stack([hour_array(load_demand, len(load_demand)), profiles])
+    peaks = series.max(axis=0)
+    series = series / np.where(peaks > 0, peaks, 1)
+    n_days = len(series) // hours_per_day
+    if n_days * hours_per_day != len(series):
+        raise ValueError(f"The series have {len(series)} hours, not a whole number of {hours_per_day} h days")
+    return series.reshape(n_days, hours_per_day, -1).transpose(0, 2, 1).reshape(n_days, -1)
+
+
+def kmedoids(features, k, seed=0, max_iterations=100):
+    """Cluster the rows of features into k clusters around medoids (rows of features).
+
+    Starts from k-means++ seeds and alternates between assigning every row to its closest
+    medoid and moving every medoid to the member with the least total squared distance
+    to its cluster. Returns the medoids (row indices) and the cluster of every row.
+    """
+    n = len(features)
+    k = min(k, n)
+    squared = (features ** 2).sum(axis=1)
+    distances = np.maximum(squared[:, None] + squared[None, :] - 2 * features @ features.T, 0)
+
+    rng = np.random.default_rng(seed)
+    medoids = [int(rng.integers(n))]
+    closest = distances[medoids[0]].copy()
+    for _ in range(1, k):
+        total = closest.sum()
+        pick = int(rng.choice(n, p=closest / total)) if total > 0 else int(np.argmax(closest))
+        medoids.append(pick)
+        np.minimum(closest, distances[pick], out=closest)
+    medoids = np.array(medoids)
+
+    for _ in range(max_iterations):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(labels == cluster)
+            if len(members):
+                updated[cluster] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return medoids, np.argmin(distances[:, medoids], axis=1)
+
+
+def extreme_days(load_demand, profiles, extremes=EXTREMES, hours_per_day=24):
+    """Days of the year to keep as representative days of their own: "peak_load" is the
+    day with the highest hourly load, "min_renewable" the day with the least renewable
+    production (every profile scaled by its peak)"""
+    load = hour_array(load_demand, len(load_demand)).reshape(-1, hours_per_day)
+    days = []
+    for extreme in extremes:
+        if extreme == "peak_load":
+            day = int(np.argmax(load.max(axis=1)))
+        elif extreme == "min_renewable":
+            if profiles is None or np.shape(profiles)[1] == 0:
+                continue
+            peaks = profiles.max(axis=0)
+            scaled = profiles / np.where(peaks > 0, peaks, 1)
+            day = int(np.argmin(scaled.sum(axis=1).reshape(-1, hours_per_day).sum(axis=1)))
+        else:
+            raise ValueError(f"Unknown extreme day {extreme}, expected one of {EXTREMES}")
+        if day not in days:
+            days.append(day)
+    return days
+
+
+def representative_days(load_demand, profiles, k, extremes=EXTREMES, seed=0, hours_per_day=24):
+    """k representative days (extreme days included) of a load and hours x profiles array,
+    as RepresentativeDays"""
+    profiles = np.empty((len(load_demand), 0)) if profiles is None else np.asarray(profiles, dtype=float)
+    features = daily_features(load_demand, profiles, hours_per_day)
+    n_days = len(features)
+    kept = extreme_days(load_demand, profiles, extremes, hours_per_day) if extremes else []
+    if k <= len(kept):
+        raise ValueError(f"k={k} leaves no day for clustering besides the {len(kept)} extreme days")
+
+    others = np.setdiff1d(np.arange(n_days), kept)
+    medoids, others_labels = kmedoids(features[others], k - len(kept), seed)
+    days = np.concatenate([kept, others[medoids]]).astype(int)
+    labels = np.empty(n_days, dtype=int)
+    labels[kept] = np.arange(len(kept))
+    labels[others] = len(kept) + others_labels
+    weights = np.bincount(labels, minlength=len(days))
+    return RepresentativeDays(days, weights, labels, hours_per_day)
+
+
+class ClusteredSizingResult:
+    """Unit counts sized on representative days and their check against the full year"""
+
+    def __init__(self, days, modes, unit_counts, objective, full_year_cost, unserved, solve_time, model):
+        self.days = days                      # RepresentativeDays
+        self.modes = list(modes)
+        self.unit_counts = unit_counts        # {mode: count}
+        self.objective = objective            # [EUR] yearly cost estimated on the representative days
+        self.full_year_cost = full_year_cost  # [EUR] yearly cost of the unit counts, every hour dispatched
+        self.unserved = unserved              # [MWh] load the unit counts cannot cover over the year
+        self.solve_time = solve_time          # [s] build and solve of the clustered model
+        self.model = model                    # solved sizing model on the representative days
+
+    @property
+    def error(self):
+        """Relative error of the clustered objective against the full-year cost"""
+        return (self.objective - self.full_year_cost) / self.full_year_cost
+
+
+def full_year_cost(unit_counts, load_demand, costs_variable, max_limits, modes=None, costs_fixed=None,
+                   co2_emissions=None, cost_co2=0, value_of_lost_load=1000):
+    """Yearly cost [EUR] and unserved load [MWh] of fixed unit counts, with every hour
+    dispatched by merit order; max_limits are the limits of one unit as in
+    build_sizing_model, load the sizing cannot cover costs value_of_lost_load [EUR/MWh]"""
+    load = hour_array(load_demand, len(load_demand))
+    n_hours = len(load)
+    fleet = Fleet.from_dicts(costs_variable, max_limits, modes, costs_fixed, co2_emissions, n_hours=n_hours)
+    counts = np.array([unit_counts[mode] for mode in fleet.modes], dtype=float)
+    costs = fleet.values("costs_variable", n_hours) + hour_array(cost_co2, n_hours)[:, None] * fleet.values(
+        "co2_emissions", n_hours)
+    limits = fleet.limits(n_hours) * counts
+    # Unserved load as the most expensive mode, so every hour is feasible
+    costs = np.column_stack([costs, np.full(n_hours, value_of_lost_load)])
+    limits = np.column_stack([limits, load])
+    result = merit_order_dispatch(load, costs, limits, modes=fleet.modes + ["unserved"])
+    cost = result.objective + n_hours * float(fleet.costs_fixed @ counts)
+    return cost, float(result.dispatch[:, -1].sum())
+
+
+def solve_clustered_sizing(load_demand, costs_variable, max_limits, max_unit_counts, k=12, modes=None,
+                           costs_fixed=None, co2_emissions=None, cost_co2=0, solver=None, extremes=EXTREMES,
+                           seed=0, value_of_lost_load=1000, hours_per_day=24):
+    """Size the plants on k representative days of the year and check them on the full year.
+
+    Takes the arguments of models.build_sizing_model over the whole year (load_demand and
+    the profiles in max_limits with one value per hour). cost_co2 can be a scalar or an
+    hourly profile. solver defaults to the solver_select choice for sizing models.
+    Returns a ClusteredSizingResult; raises RuntimeError when the clustered model is not
+    solved to optimality.
+    """
+    if solver is None:
+        from solver_select import default_solver
+
+        solver = default_solver("sizing")
+    load = hour_array(load_demand, len(load_demand))
+    fleet = Fleet.from_dicts(costs_variable, max_limits, modes, costs_fixed, co2_emissions, n_hours=len(load))
+    days = representative_days(load, fleet.profiles, k, extremes, seed, hours_per_day)
+
+    start = time.perf_counter()
+    clustered = fleet.take(days.select(np.arange(len(load))).astype(int))
+    model = build_sizing_model(days.select(load), max_unit_counts=max_unit_counts,
+                               cost_co2=days.select(hour_array(cost_co2, len(load))), fleet=clustered,
+                               hour_weights=days.hour_weights)
+    opt = pyo.SolverFactory(solver)
+    results = opt.solve(model, load_solutions=False)
+    condition = results.solver.termination_condition
+    if condition != pyo.TerminationCondition.optimal:
+        raise RuntimeError(f"Clustered sizing model not solved: {condition}")
+    if hasattr(opt, "load_vars"):
+        opt.load_vars()
+    else:
+        model.solutions.load_from(results)
+    solve_time = time.perf_counter() - start
+
+    unit_counts = dict(zip(fleet.modes, np.round(values(model.production_unit_count)).astype(int).tolist()))
+    cost, unserved = full_year_cost(unit_counts, load, fleet.values("costs_variable", len(load)),
+                                    fleet.limits(len(load)), fleet.modes, fleet.costs_fixed,
+                                    fleet.values("co2_emissions", len(load)), cost_co2,
+                                    value_of_lost_load)
+    return ClusteredSizingResult(days, fleet.modes, unit_counts, float(pyo.value(model.objective)), cost, unserved,
+                                 solve_time, model)
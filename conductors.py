@@ -0,0 +1,108 @@
+"""Vectorized conductor selection
+
+Evaluates the annual cost of a line (investment annuity plus cost of losses, as c_75 and
+c_90 in problem2.py) for a whole conductor catalog over grids of line length, load,
+prices, lifetime and discount rate, and picks the cheapest conductor for every grid
+cell. All inputs broadcast against each other like NumPy arrays, so
+
+    cheapest_conductor(length=np.linspace(1, 20, 1000)[:, None], power_peak=np.linspace(1, 8, 1000), ...)
+
+screens a million feeders in one call. The annual cost of conductor j is
+
+    length * annuity(rate, lifetime) * investment_j + K / area_j
+
+where K holds everything that does not depend on the conductor, so each cell costs two
+multiply-adds per conductor.
+"""
+import numpy as np
+
+from line_economics import CONDUCTORS, PROBLEM2, annuity, line_capacity
+
+
+class ConductorChoice:
+    """Cheapest conductor of every grid cell"""
+
+    def __init__(self, names, index, cost):
+        self.names = list(names)  # catalog names
+        self.index = index        # catalog index per cell, -1 when no conductor can carry the load
+        self.cost = cost          # [NOK] annual cost of the chosen conductor, inf when none
+
+    @property
+    def conductor(self):
+        """Name of the chosen conductor per cell (None when none can carry the load)"""
+        return np.asarray(self.names + [None], dtype=object)[self.index]
+
+    def counts(self):
+        """How many cells chose each conductor"""
+        counts = np.bincount(self.index.ravel() + 1, minlength=len(self.names) + 1)
+        return dict(zip([None] + self.names, counts.tolist()))
+
+
+def catalog_arrays(catalog=CONDUCTORS):
+    """Names, cross sections [mm^2], maximum currents [A] and investment costs [NOK/km] of a
+    catalog {name: (area, max current, investment)} as arrays"""
+    names = list(catalog)
+    areas, currents, investments = np.array([catalog[name] for name in names], dtype=float).T
+    return names, areas, currents, investments
+
+
+def loss_coefficient(power_peak, power_valley, price_peak, price_valley, h_peak, h_valley, length, voltage,
+                     resistivity=18):
+    """K [NOK mm^2]: the annual cost of losses of a line with a 1 mm^2 cross section"""
+    return (length * resistivity * 1e-6 / voltage ** 2) * 365 * (
+        price_peak * power_peak ** 2 * h_peak + price_valley * power_valley ** 2 * h_valley)
+
+
+def _inputs(overrides):
+    unknown = set(overrides) - set(PROBLEM2)
+    if unknown:
+        raise ValueError(f"Unknown inputs {sorted(unknown)}, expected names of line_economics.PROBLEM2")
+    d = dict(PROBLEM2, **overrides)
+    d = {key: np.asarray(value, dtype=float) for key, value in d.items()}
+    # The line carries the load plus the charging stations, as in problem2.py
+    d["power_peak"] = d["power_peak"] + d["p_ch_car"] * d["n_ch_points"]
+    annualized = d["length"] * annuity(d["rate"], d["lifetime"])
+    losses = loss_coefficient(d["power_peak"], d["power_valley"], d["price_peak"], d["price_valley"],
+                              d["h_peak"], d["h_valley"], d["length"], d["voltage"], d["resistivity"])
+    return d, annualized, losses
+
+
+def catalog_costs(catalog=CONDUCTORS, check_capacity=True, **inputs):
+    """Annual cost [NOK] of every conductor for every grid cell, with the conductors on the last axis.
+
+    inputs override the PROBLEM2 data with scalars or broadcastable arrays. The line carries
+    power_peak plus the charging stations (set n_ch_points=0 to give the line load directly).
+    With check_capacity, conductors whose maximum power is below the peak load cost inf.
+    """
+    names, areas, currents, investments = catalog_arrays(catalog)
+    d, annualized, losses = _inputs(inputs)
+    cost = annualized[..., None] * investments + losses[..., None] / areas
+    if check_capacity:
+        cost = np.where(line_capacity(d["voltage"][..., None], currents) < d["power_peak"][..., None], np.inf, cost)
+    return cost
+
+
+def cheapest_conductor(catalog=CONDUCTORS, check_capacity=True, **inputs):
+    """The cheapest conductor of catalog for every grid cell, as a ConductorChoice.
+
+    Takes the same inputs as catalog_costs but keeps a running minimum over the catalog,
+    so memory stays at a few arrays of the grid shape whatever the catalog size.
+    """
+    names, areas, currents, investments = catalog_arrays(catalog)
+    d, annualized, losses = _inputs(inputs)
+    shape = np.broadcast_shapes(annualized.shape, losses.shape,
+                                d["power_peak"].shape if check_capacity else ())
+    best_cost = np.full(shape, np.inf)
+    best = np.full(shape, -1, dtype=np.intp)
+    cost = np.empty(shape)
+    better = np.empty(shape, dtype=bool)
+    for j in range(len(names)):
+        np.multiply(annualized, investments[j], out=cost)
+        cost += losses / areas[j]
+        if check_capacity:
+            np.putmask(cost, np.broadcast_to(d["power_peak"] > line_capacity(d["voltage"], currents[j]), shape),
+                       np.inf)
+        np.less(cost, best_cost, out=better)
+        np.copyto(best_cost, cost, where=better)
+        best[better] = j
+    return ConductorChoice(names, best, best_cost)
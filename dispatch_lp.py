@@ -0,0 +1,124 @@
+"""Matrix-form LP backend for the hourly dispatch models
+
+Builds the same problem as the problem3_task*.py scripts (power_production[hour, mode],
+production limits and one demand row per hour) directly as sparse SciPy arrays and
+solves it in memory with HiGHS, without going through Pyomo or an LP file.
+Variables are flattened hour-major, i.e. column hour * len(modes) + mode, which is the
+same order Pyomo uses for model.power_production.
+"""
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+
+def mode_array(values, modes, n_hours):
+    """Return an hours x modes float64 array from per-mode scalars or hourly profiles.
+
+    values can be a dict like the ones in the task scripts ({"coal": 120, "wind": [32, 51, ...]})
+    or anything that broadcasts to (n_hours, len(modes)).
+    """
+    if isinstance(values, dict):
+        out = np.empty((n_hours, len(modes)))
+        for j, mode in enumerate(modes):
+            out[:, j] = values[mode]
+        return out
+    return np.broadcast_to(np.asarray(values, dtype=float), (n_hours, len(modes)))
+
+
+def hour_array(values, n_hours):
+    """Return a length n_hours float64 array from a scalar or an hourly profile"""
+    return np.broadcast_to(np.asarray(values, dtype=float), (n_hours,))
+
+
+class DispatchLP:
+    """Sparse LP data of one dispatch problem: min c x + constant, A_ub x <= b_ub, A_eq x == b_eq"""
+
+    def __init__(self, modes, n_hours, c, upper, A_eq, b_eq, A_ub=None, b_ub=None, constant=0.0, co2=None,
+                 cost_co2=None):
+        self.modes = list(modes)
+        self.n_hours = n_hours
+        self.c = c                # [EUR/MWh] per variable
+        self.upper = upper        # [MW] production limits, as variable bounds
+        self.A_eq = A_eq          # demand rows
+        self.b_eq = b_eq
+        self.A_ub = A_ub          # coupling rows (NOx cap)
+        self.b_ub = b_ub
+        self.constant = constant  # [EUR] fixed costs, independent of the dispatch
+        self.co2 = co2            # [tons/MWh] per variable, hours x modes, or None
+        self.cost_co2 = cost_co2  # [EUR/ton CO2] per hour, included in c
+
+    @property
+    def bounds(self):
+        return np.column_stack([np.zeros_like(self.upper), self.upper])
+
+
+class DispatchResult:
+    """Solution of a DispatchLP"""
+
+    def __init__(self, lp, objective, dispatch, status, message, raw=None):
+        self.lp = lp
+        self.objective = objective  # [EUR] including fixed costs, same as pyo.value(model.objective)
+        self.dispatch = dispatch    # [MW] hours x modes
+        self.status = status
+        self.message = message
+        self.raw = raw              # scipy OptimizeResult
+
+    @property
+    def co2_emissions(self):
+        """Hourly CO2 emissions [tons], or None when the LP has no emission factors"""
+        if self.lp.co2 is None:
+            return None
+        return (self.dispatch * self.lp.co2).sum(axis=1)
+
+
+def demand_matrix(n_hours, n_modes):
+    """Sparse rows summing power_production[hour, :] for every hour"""
+    n = n_hours * n_modes
+    return sp.csr_matrix(
+        (np.ones(n), np.arange(n), np.arange(0, n + 1, n_modes)),
+        shape=(n_hours, n))
+
+
+def build_dispatch_lp(load_demand, costs_variable, max_limits, modes=None, costs_fixed=None,
+                      co2_emissions=None, cost_co2=0, nox_emissions=None, nox_limit=None):
+    """Assemble the dispatch problem of the task scripts as sparse arrays.
+
+    Arguments take the same shapes as in the scripts: load_demand is an hourly profile and
+    the per-mode data are dicts of scalars or hourly lists (or arrays broadcastable to
+    hours x modes). cost_co2 is a scalar or hourly profile [EUR/ton CO2]. When nox_limit
+    is given, the total NOx emissions are capped as in problem3_task4.py.
+    """
+    if modes is None:
+        modes = list(costs_variable)
+    load = np.asarray(load_demand, dtype=float)
+    n_hours, n_modes = len(load), len(modes)
+
+    costs = mode_array(costs_variable, modes, n_hours)
+    co2 = co2_price = None
+    if co2_emissions is not None:
+        co2 = mode_array(co2_emissions, modes, n_hours)
+        co2_price = hour_array(cost_co2, n_hours)
+        costs = costs + co2_price[:, None] * co2
+    upper = np.ascontiguousarray(mode_array(max_limits, modes, n_hours)).ravel()
+
+    A_ub = b_ub = None
+    if nox_limit is not None:
+        A_ub = sp.csr_matrix(mode_array(nox_emissions, modes, n_hours).reshape(1, -1))
+        b_ub = np.array([nox_limit], dtype=float)
+
+    constant = 0.0
+    if costs_fixed is not None:
+        constant = float(mode_array(costs_fixed, modes, n_hours).sum())
+
+    return DispatchLP(modes, n_hours, np.ascontiguousarray(costs).ravel(), upper,
+                      demand_matrix(n_hours, n_modes), load, A_ub, b_ub, constant, co2, co2_price)
+
+
+def solve_dispatch_lp(lp, **options):
+    """Solve a DispatchLP with HiGHS and return a DispatchResult"""
+    res = linprog(lp.c, A_ub=lp.A_ub, b_ub=lp.b_ub, A_eq=lp.A_eq, b_eq=lp.b_eq,
+                  bounds=lp.bounds, method="highs", options=options or None)
+    if res.status != 0:
+        raise RuntimeError(f"Dispatch LP not solved: {res.message}")
+    dispatch = res.x.reshape(lp.n_hours, len(lp.modes))
+    return DispatchResult(lp, res.fun + lp.constant, dispatch, res.status, res.message, res)
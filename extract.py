@@ -0,0 +1,148 @@
+"""Bulk extraction of solved models into NumPy arrays and pandas DataFrames
+
+Reads all values of a variable (or all duals of a constraint) in one pass into a
+preallocated float64 array and labels it from the model's own hours and modes sets,
+instead of calling pyo.value per element and slicing flat lists with output[0::4].
+Adding, removing or reordering modes cannot shift columns.
+"""
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+
+DISPATCH_VARIABLES = ("power_producers", "power_production", "power_output")
+
+
+def values(component):
+    """Values of all entries of a Var, in index order, as a float64 array (None becomes NaN)"""
+    try:
+        return np.fromiter(map(attrgetter("value"), component.values()), dtype=float, count=len(component))
+    except TypeError:
+        return np.fromiter((np.nan if v.value is None else v.value for v in component.values()),
+                           dtype=float, count=len(component))
+
+
+def hours_modes_array(model, component):
+    """Values of a Var indexed by (hours, modes) or (modes, hours) as an hours x modes array"""
+    array = values(component)
+    first = next(iter(component.index_set().subsets())) if component.dim() == 2 else None
+    if first is model.modes:
+        return array.reshape(len(model.modes), len(model.hours)).T
+    return array.reshape(len(model.hours), len(model.modes))
+
+
+def param_array(model, param):
+    """Values of a Param indexed by (hours, modes), modes, hours or nothing as an hours x modes array"""
+    shape = (len(model.hours), len(model.modes))
+    if not param.is_indexed():
+        return np.full(shape, pyo.value(param))
+    array = np.fromiter((pyo.value(p) for p in param.values()), dtype=float, count=len(param))
+    if param.dim() == 2:
+        first = next(iter(param.index_set().subsets()))
+        return array.reshape(shape[::-1]).T if first is model.modes else array.reshape(shape)
+    if param.index_set() is model.modes:
+        return np.broadcast_to(array, shape)
+    return np.broadcast_to(array[:, None], shape)
+
+
+def limits_array(model):
+    """Production limits [MW] as an hours x modes array, with the hourly profiles of the
+    modes in model.profile_modes when the model has them (see models.add_fleet_params)"""
+    limits = param_array(model, model.max_limits)
+    if model.component("max_profiles") is None or not len(model.profile_modes):
+        return limits
+    limits = limits.copy()
+    columns = [list(model.modes).index(mode) for mode in model.profile_modes]
+    profiles = np.fromiter((pyo.value(p) for p in model.max_profiles.values()), dtype=float,
+                           count=len(model.max_profiles))
+    limits[:, columns] = profiles.reshape(len(model.hours), len(columns))
+    return limits
+
+
+def dispatch_variable(model):
+    """The production variable of a task model"""
+    for name in DISPATCH_VARIABLES:
+        var = model.component(name)
+        if var is not None:
+            return var
+    raise ValueError(f"Model has none of the production variables {DISPATCH_VARIABLES}")
+
+
+def dispatch_array(model, scale_by_units=True):
+    """Production [MW] of every hour and mode as an hours x modes array.
+
+    In the sizing model (task 9) power_production is the output of one unit; with
+    scale_by_units it is multiplied by production_unit_count to give the total.
+    """
+    var = dispatch_variable(model)
+    array = hours_modes_array(model, var)
+    counts = model.component("production_unit_count")
+    if scale_by_units and counts is not None and var.local_name == "power_production":
+        array = array * values(counts)
+    return array
+
+
+def dispatch_frame(model, scale_by_units=True):
+    """Production [MW] as a DataFrame with the hours as index and the modes as columns"""
+    return pd.DataFrame(dispatch_array(model, scale_by_units), index=list(model.hours),
+                        columns=pd.Index(list(model.modes), name="mode"))
+
+
+def duals(model, constraint):
+    """Duals of all entries of a constraint from model.dual (NaN when not imported)"""
+    suffix = model.component("dual")
+    if suffix is None:
+        return np.full(len(constraint), np.nan)
+    return np.fromiter((suffix.get(c, np.nan) for c in constraint.values()), dtype=float, count=len(constraint))
+
+
+def hours_modes_duals(model, constraint):
+    """Duals of a constraint indexed by (hours, modes) as an hours x modes array"""
+    return duals(model, constraint).reshape(len(model.hours), len(model.modes))
+
+
+def reduced_costs(model, var):
+    """Reduced costs of all entries of a Var from model.rc (NaN when not imported)"""
+    suffix = model.component("rc")
+    if suffix is None:
+        return np.full(len(var), np.nan)
+    return np.fromiter((suffix.get(v, np.nan) for v in var.values()), dtype=float, count=len(var))
+
+
+def marginal_prices(model):
+    """Marginal prices of a dispatch model solved with duals=True, in one pass:
+
+        price          [EUR/MWh] demand_constraint duals, the hourly system marginal price
+        nox_price      [EUR/ton] nox_emission_constraint dual (NaN without a NOx cap)
+        limit_duals    [EUR/MW] production_limit_constraint duals, hours x modes (<= 0,
+                       the saving of one more MW of limit)
+        reduced_costs  [EUR/MWh] reduced costs of the production variable, hours x modes
+    """
+    var = dispatch_variable(model)
+    nox = model.component("nox_emission_constraint")
+    return {
+        "price": duals(model, model.demand_constraint),
+        "nox_price": float(duals(model, nox)[0]) if nox is not None else np.nan,
+        "limit_duals": hours_modes_duals(model, model.production_limit_constraint),
+        "reduced_costs": reduced_costs(model, var).reshape(len(model.hours), len(model.modes)),
+    }
+
+
+def results_frame(model):
+    """Hourly results in one DataFrame: production per mode plus, when the model has them,
+    SOC, Ein and Eout of the battery and the demand dual as "price"."""
+    df = dispatch_frame(model)
+    df.columns = list(df.columns)
+    for name in ("SOC", "Ein", "Eout"):
+        var = model.component(name)
+        if var is not None:
+            df[name] = values(var)
+    if model.component("dual") is not None:
+        df["price"] = duals(model, model.demand_constraint)
+    return df
+
+
+def unit_counts(model):
+    """Unit counts of the sizing model as a Series indexed by mode"""
+    return pd.Series(values(model.production_unit_count), index=list(model.modes), name="units")
@@ -0,0 +1,160 @@
+"""Generator fleet data as a struct of arrays
+
+The task scripts store every generator parameter as Param(model.hours, model.modes),
+copying each per-mode constant into every hour. A Fleet keeps one float64 array entry
+per mode for the constant data (costs, emission factors, limits) and a single
+hours x profiles array for the modes whose limit follows an hourly profile (wind,
+solar). The model builders read it with broadcasting, so constant data costs
+len(modes) entries instead of len(hours) * len(modes).
+
+Variable costs and emission factors can still vary by hour (hourly prices, a fuel
+switch): such a field is kept as a full hours x modes array in Fleet.hourly on top of
+its per-mode values, and the model builders index its parameter by hour and mode.
+"""
+import numpy as np
+
+# Fields that can be hourly profiles besides max_limits
+HOURLY_FIELDS = ("costs_variable", "co2_emissions", "nox_emissions")
+
+
+def mode_columns(values, modes):
+    """Split a dict {mode: value} or an array broadcasting to len(modes) or hours x modes
+    into one float64 array per mode (a scalar or an hourly profile)"""
+    if isinstance(values, dict):
+        return [np.asarray(values[mode], dtype=float) for mode in modes]
+    if np.ndim(values) == 2:
+        return list(np.asarray(values, dtype=float).T)
+    return [np.asarray(value) for value in np.broadcast_to(np.asarray(values, dtype=float), (len(modes),))]
+
+
+def is_profile(column):
+    return column.ndim > 0 and np.ptp(column) > 0
+
+
+def mode_values(values, modes, name="values"):
+    """Return one float64 per mode; hourly profiles are accepted only when they are constant"""
+    out = np.empty(len(modes))
+    for j, column in enumerate(mode_columns(values, modes)):
+        if is_profile(column):
+            raise ValueError(f"{name} of {modes[j]} varies by hour, only max_limits can be an hourly profile")
+        out[j] = column.ravel()[0] if column.ndim else column
+    return out
+
+
+def varies_by_hour(values, modes):
+    """True when values (as taken by mode_columns) has an hourly profile for some mode"""
+    return any(is_profile(column) for column in mode_columns(values, modes))
+
+
+def hourly_values(values, modes, n_hours):
+    """hours x modes float64 array of values as taken by mode_columns"""
+    out = np.empty((n_hours, len(modes)))
+    for j, column in enumerate(mode_columns(values, modes)):
+        out[:, j] = column
+    return out
+
+
+class Fleet:
+    """Data of all modes, one array entry per mode"""
+
+    def __init__(self, modes, costs_fixed, costs_variable, max_limits, co2_emissions, nox_emissions,
+                 profile_modes=(), profiles=None, hourly=None):
+        self.modes = list(modes)
+        self.costs_fixed = costs_fixed        # [EUR/h]
+        self.costs_variable = costs_variable  # [EUR/MWh]
+        self.max_limits = max_limits          # [MW], for profiled modes the peak of the profile
+        self.co2_emissions = co2_emissions    # [tons/MWh]
+        self.nox_emissions = nox_emissions    # [tons/MWh]
+        self.profile_modes = list(profile_modes)  # modes whose limit follows an hourly profile
+        self.profiles = profiles              # [MW] hours x profile_modes, or None
+        # hours x modes arrays of the HOURLY_FIELDS that vary by hour (their per-mode value is the mean)
+        self.hourly = dict(hourly or {})
+
+    @classmethod
+    def from_dicts(cls, costs_variable, max_limits, modes=None, costs_fixed=None, co2_emissions=None,
+                   nox_emissions=None, n_hours=None, hourly=()):
+        """Build a fleet from the arguments of the model builders.
+
+        Takes the same shapes as the task scripts ({"coal": 120, "wind": [32, 51, ...]}) or
+        arrays broadcasting to len(modes) or hours x modes. A limit given as an array over
+        the hours becomes a profile unless it is constant; costs_variable, co2_emissions
+        and nox_emissions varying by hour are kept in hourly. The fields named in hourly are
+        kept by hour even when constant ("max_limits": every mode gets a profile), so
+        models built from the fleet accept hourly values for them later.
+        """
+        if modes is None:
+            modes = list(costs_variable)
+        limits = mode_columns(max_limits, modes)
+        if hourly and n_hours is None:
+            raise ValueError("n_hours is needed to keep fields by hour")
+
+        fields = {"costs_variable": costs_variable, "co2_emissions": co2_emissions, "nox_emissions": nox_emissions}
+        per_mode, by_hour = {}, {}
+        for name, values in fields.items():
+            values = values if values is not None else 0
+            if name in hourly or varies_by_hour(values, modes):
+                if n_hours is None:
+                    n_hours = max(np.size(column) for column in mode_columns(values, modes))
+                by_hour[name] = hourly_values(values, modes, n_hours)
+                per_mode[name] = by_hour[name].mean(axis=0)
+            else:
+                per_mode[name] = mode_values(values, modes, name)
+
+        profile_modes, columns = [], []
+        for mode, limit in zip(modes, limits):
+            if is_profile(limit) or "max_limits" in hourly:
+                profile_modes.append(mode)
+                columns.append(limit if n_hours is None else np.broadcast_to(limit, (n_hours,)))
+        peaks = np.array([limit.max() if limit.ndim else float(limit) for limit in limits])
+
+        return cls(
+            modes,
+            mode_values(costs_fixed if costs_fixed is not None else 0, modes, "costs_fixed"),
+            per_mode["costs_variable"],
+            peaks,
+            per_mode["co2_emissions"],
+            per_mode["nox_emissions"],
+            profile_modes,
+            np.column_stack(columns) if columns else None,
+            by_hour)
+
+    @property
+    def n_hours(self):
+        """Length of the profiles, None when every field is constant"""
+        if self.profiles is not None:
+            return len(self.profiles)
+        return next((len(values) for values in self.hourly.values()), None)
+
+    @property
+    def profiled(self):
+        """Boolean mask of the modes with an hourly limit profile"""
+        return np.isin(self.modes, self.profile_modes)
+
+    def profile(self, mode):
+        """Hourly limit [MW] of a profiled mode, as a view"""
+        return self.profiles[:, self.profile_modes.index(mode)]
+
+    def limits(self, n_hours):
+        """Limits [MW] of all modes as an hours x modes array"""
+        out = np.empty((n_hours, len(self.modes)))
+        out[:] = self.max_limits
+        if self.profiles is not None:
+            out[:, self.profiled] = self.profiles
+        return out
+
+    def values(self, name, n_hours):
+        """costs_variable, co2_emissions or nox_emissions as an hours x modes array"""
+        if name in self.hourly:
+            return self.hourly[name]
+        return np.broadcast_to(getattr(self, name), (n_hours, len(self.modes)))
+
+    def take(self, hours):
+        """The same fleet over hours, a slice (giving views) or an array of hour indices"""
+        return Fleet(self.modes, self.costs_fixed, self.costs_variable, self.max_limits, self.co2_emissions,
+                     self.nox_emissions, self.profile_modes,
+                     None if self.profiles is None else self.profiles[hours],
+                     {name: values[hours] for name, values in self.hourly.items()})
+
+    def window(self, start, stop):
+        """The same fleet over hours start to stop; the profiles are views"""
+        return self.take(slice(start, stop))
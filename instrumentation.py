@@ -0,0 +1,275 @@
+"""Per-phase timing and memory records of model runs
+
+A Recorder collects the wall time and, with memory=True, the peak Python memory
+(tracemalloc, above what was allocated when the phase started) of every phase of a
+run (data, build, write, solve, load, extract, plot, ... and the total),
+tagged with the task name and the instance size, and writes them as JSON lines and as
+a Prometheus text file that a node_exporter textfile collector or any local scraper
+can read:
+
+    recorder = Recorder("metrics.jsonl", "metrics.prom", memory=True)
+    with recorder.run("task3", solver="appsi_highs"):
+        with phase("build"):
+            model = build_dispatch_model(**TASK3)
+        tag(hours=len(model.hours), modes=len(model.modes))
+        solve(opt, model)  # write, solve and load phases
+
+phase, tag and solve work on the run that is active in the current thread and do
+nothing extra without one, so library code can be instrumented unconditionally.
+tracemalloc slows Python allocations down several times (importing Pyomo most of all),
+so memory is off by default and the timings of a run with memory=True are inflated.
+"""
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = "planning"
+
+# Steps of pyomo.opt.base.solvers.OptSolver.solve and the phases they are recorded as
+SOLVER_STEPS = {"_presolve": "write", "_apply_solver": "solve", "_postsolve": "read"}
+
+_local = threading.local()
+
+
+def _max_rss():
+    """Peak resident memory of the process [bytes], None where not available"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if os.uname().sysname == "Darwin" else rss * 1024
+
+
+class Run:
+    """Phase records of one run"""
+
+    def __init__(self, task, memory, tags):
+        self.id = uuid.uuid4().hex[:12]
+        self.task = task
+        self.memory = memory
+        self.tags = dict(tags)
+        self.records = []
+        self._stack = []  # peak traced memory seen by the open phases
+
+    def tag(self, **tags):
+        """Add tags (e.g. hours, modes) to every record of the run, also earlier ones"""
+        self.tags.update(tags)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Record the wall time and peak memory of the block as phase name. The peak is the
+        traced memory above what was allocated when the phase started. Nested phases are
+        recorded on their own and count toward the peak of the enclosing phase."""
+        baseline = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1] = max(self._stack[-1], peak)
+            tracemalloc.reset_peak()
+            baseline = current
+        self._stack.append(baseline)
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            peak = self._stack.pop()
+            if self.memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1] = max(self._stack[-1], peak)
+                tracemalloc.reset_peak()
+            self.records.append({"phase": name, "seconds": seconds,
+                                 "peak_memory_bytes": peak - baseline if self.memory else None,
+                                 "max_rss_bytes": _max_rss(), "status": status, "time": time.time()})
+
+
+class Recorder:
+    """Writes the phase records of every run to a JSON lines file and a Prometheus text file.
+
+    The JSON lines file gets one line per phase and run, appended. The Prometheus file
+    is rewritten after every run with the last duration and peak memory of every task,
+    phase and size, and the total duration and number of runs recorded by this Recorder
+    (the JSON lines file keeps the history across processes); either path can be None.
+    memory=True traces the peak memory of every phase with tracemalloc, at the price of
+    much slower allocations, so only the memory of such runs is meaningful.
+    """
+
+    def __init__(self, jsonl_path="metrics.jsonl", prometheus_path="metrics.prom", memory=False):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.memory = memory
+        self.last = {}    # (metric labels) -> (seconds, peak memory)
+        self.totals = {}  # (metric labels) -> (total seconds, runs)
+
+    @contextlib.contextmanager
+    def run(self, task, **tags):
+        """Make a Run the active run of this thread for the block, then write its records"""
+        run = Run(task, self.memory, tags)
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        previous = getattr(_local, "run", None)
+        _local.run = run
+        try:
+            with run.phase("total"):
+                yield run
+        finally:
+            _local.run = previous
+            if started:
+                tracemalloc.stop()
+            self.write(run)
+
+    def write(self, run):
+        records = [dict(record, run=run.id, task=run.task, **run.tags) for record in run.records]
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        for record in records:
+            labels = (("task", run.task), ("phase", record["phase"])) + tuple(
+                (key, str(value)) for key, value in sorted(run.tags.items()))
+            self.last[labels] = (record["seconds"], record["peak_memory_bytes"])
+            seconds, count = self.totals.get(labels, (0.0, 0))
+            self.totals[labels] = (seconds + record["seconds"], count + 1)
+        if self.prometheus_path is not None:
+            _write_atomic(self.prometheus_path, self.prometheus_text())
+
+    def prometheus_text(self):
+        """The metrics in the Prometheus text exposition format"""
+        metrics = [
+            ("phase_duration_seconds", "gauge", "Wall time of the last run of a phase",
+             {labels: seconds for labels, (seconds, _) in self.last.items()}),
+            ("phase_peak_memory_bytes", "gauge", "Peak traced Python memory allocated during the last run of a phase",
+             {labels: peak for labels, (_, peak) in self.last.items() if peak is not None}),
+            ("phase_duration_seconds_total", "counter", "Total wall time of a phase over all runs",
+             {labels: seconds for labels, (seconds, _) in self.totals.items()}),
+            ("phase_runs_total", "counter", "Number of runs of a phase",
+             {labels: count for labels, (_, count) in self.totals.items()}),
+        ]
+        lines = []
+        for name, kind, description, samples in metrics:
+            name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples.items():
+                text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                lines.append(f"{name}{{{text}}} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path, text):
+    # Write next to path and rename, so a scraper never reads a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def current_run():
+    """The active Run of this thread, or None"""
+    return getattr(_local, "run", None)
+
+
+def phase(name):
+    """Context manager recording phase name of the active run (no-op without one)"""
+    run = current_run()
+    if run is None:
+        return contextlib.nullcontext()
+    return run.phase(name)
+
+
+def tag(**tags):
+    """Tag the active run (no-op without one)"""
+    run = current_run()
+    if run is not None:
+        run.tag(**tags)
+
+
+def solve(opt, model, **kwargs):
+    """opt.solve(model, load_solutions=True, **kwargs) split into the write, solve and load
+    phases of the active run.
+
+    For persistent solvers (APPSI) write is loading the model into the solver; for
+    solvers run as a separate process (glpk, cbc, gurobi's shell interface) it is writing
+    the problem file, solve is the solver process, read is reading its solution file and
+    load is loading the solution into the model. Without an active run this is a plain
+    opt.solve.
+
+    Pyomo has no public timing of these steps, so they are timed by wrapping the
+    _presolve, _apply_solver and _postsolve methods that OptSolver.solve calls (Pyomo 5
+    and 6, checked with 6.10) on the solver object for the duration of the call. A
+    solver without all three (e.g. the pyomo.contrib.solver interfaces) is timed as one
+    solve phase.
+    """
+    load = kwargs.pop("load_solutions", True)
+    run = current_run()
+    if run is None:
+        return opt.solve(model, load_solutions=load, **kwargs)
+
+    if hasattr(opt, "set_instance") and hasattr(opt, "load_vars"):
+        with run.phase("write"):
+            opt.set_instance(model)
+        with run.phase("solve"):
+            results = opt.solve(model, load_solutions=False, **kwargs)
+        if load:
+            with run.phase("load"):
+                opt.load_vars()
+        return results
+
+    if all(hasattr(opt, method) for method in SOLVER_STEPS):
+        with _timed_steps(run, opt):
+            results = opt.solve(model, load_solutions=False, **kwargs)
+    else:
+        with run.phase("solve"):
+            results = opt.solve(model, load_solutions=False, **kwargs)
+    if load:
+        with run.phase("load"):
+            model.solutions.load_from(results)
+    return results
+
+
+@contextlib.contextmanager
+def _timed_steps(run, opt):
+    """Record the SOLVER_STEPS of opt as phases of run inside the block, then put the
+    original methods back, also when the solve fails"""
+    originals = {method: opt.__dict__[method] for method in SOLVER_STEPS if method in opt.__dict__}
+    for method, name in SOLVER_STEPS.items():
+        setattr(opt, method, _timed(run, name, getattr(opt, method)))
+    try:
+        yield
+    finally:
+        for method in SOLVER_STEPS:
+            if method in originals:
+                setattr(opt, method, originals[method])
+            else:
+                delattr(opt, method)
+
+
+def _timed(run, name, function):
+    def timed(*args, **kwargs):
+        with run.phase(name):
+            return function(*args, **kwargs)
+    return timed
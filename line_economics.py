@@ -0,0 +1,150 @@
+"""Line and battery economics of problem 2
+
+The formulas of problem 2 as plain functions; problem2.py prints their results and
+draws the sensitivity figures from them. The module imports nothing and only uses
+arithmetic operators, so it loads in microseconds and every function works on floats
+and NumPy arrays alike.
+"""
+
+# Data of problem 2
+PROBLEM2 = dict(
+    p_ch_car=0.055,        # [MW] Charging station consumption
+    n_ch_points=52,        # Number of charging stations
+    power_peak=3.5,        # [MW] Peak consumption without the charging stations
+    power_valley=1.25,     # [MW] Valley consumption without the charging stations
+    price_peak=325,        # [NOK/MWh] Energy price for peak consumption
+    price_valley=210,      # [NOK/MWh] Energy price for valley consumption
+    h_peak=6,              # [h] Number of peak hours
+    h_valley=18,           # [h] Number of valley hours
+    length=8,              # [km] Length of the line
+    resistivity=18,        # [ohm*mm^2/km] Resistivity of the line
+    voltage=0.01,          # [MV] Voltage of the line
+    lifetime=20,           # [years]
+    rate=0.085,            # Discount rate
+    efficiency_ch=0.94,    # Battery charging efficiency
+    efficiency_disch=0.92, # Battery discharging efficiency
+)
+
+# Conductors of problem 2: cross section [mm^2], maximum current [A], investment cost [NOK/km]
+# (FeAl25 is the existing line)
+CONDUCTORS = {
+    "FeAl25": (25, 255, 0),
+    "FeAl75": (60, 424, 750000),
+    "FeAl90": (90, 485, 900000),
+}
+
+
+def annuity(rate, years):
+    """Annuity factor: annual payment per NOK invested"""
+    return rate / (1 - (1 + rate) ** -years)
+
+
+def resistance(length, area, resistivity=18):
+    """Line resistance [ohm] from length [km], cross section [mm^2] and resistivity [ohm*mm^2/km]"""
+    return length * resistivity / area
+
+
+def line_capacity(voltage, current):
+    """Maximum three-phase power [MW] of a line at voltage [MV] and maximum current [A]"""
+    return 3 ** 0.5 * voltage * current
+
+
+def loss_power(resistance, power, voltage):
+    """Line losses [MW] at power [MW] (10^-6 to convert ohms to mega ohms)"""
+    return resistance * 1e-6 * power ** 2 / voltage ** 2
+
+
+def annual_energy_cost(power_peak, power_valley, price_peak, price_valley, h_peak, h_valley):
+    """Yearly cost [NOK] of power_peak MW in the peak hours and power_valley MW in the valley hours"""
+    return 365 * (price_peak * power_peak * h_peak + price_valley * power_valley * h_valley)
+
+
+def annual_line_cost(investment, area, power_peak, power_valley, price_peak, price_valley, h_peak, h_valley,
+                     length, voltage, rate, lifetime, resistivity=18):
+    """Annual investment cost plus annual cost of losses [NOK] of a line (c_75, c_90 of problem 2)"""
+    r = resistance(length, area, resistivity)
+    losses = annual_energy_cost(loss_power(r, power_peak, voltage), loss_power(r, power_valley, voltage),
+                                price_peak, price_valley, h_peak, h_valley)
+    return investment * length * annuity(rate, lifetime) + losses
+
+
+def optimal_cross_section(cost_slope, power_peak, power_valley, price_peak, price_valley, h_peak, h_valley,
+                          length, voltage, rate, lifetime, resistivity=18):
+    """Cross section [mm^2] minimizing the annual cost for an investment cost linear in the
+    cross section with slope cost_slope [NOK/km/mm^2] (dc/dx = L E b - K / x^2 = 0)"""
+    k = (length * resistivity / (voltage * 10 ** 3) ** 2) * 365 * (
+        price_peak * power_peak ** 2 * h_peak + price_valley * power_valley ** 2 * h_valley)
+    return (k / (length * annuity(rate, lifetime) * cost_slope)) ** 0.5
+
+
+def battery_power(power_peak, power_valley, h_peak, h_valley, efficiency_ch, efficiency_disch):
+    """Discharge and charge power [MW] that make the grid import constant over the day"""
+    discharge = (power_peak - power_valley) / (h_peak / (efficiency_ch * h_valley * efficiency_disch) + 1)
+    charge = power_peak - discharge - power_valley
+    return discharge, charge
+
+
+def battery_capacity(power_peak, power_valley, h_peak, h_valley, efficiency_ch, efficiency_disch):
+    """Battery capacity [MWh] charged in the valley hours and discharged in the peak hours"""
+    _, charge = battery_power(power_peak, power_valley, h_peak, h_valley, efficiency_ch, efficiency_disch)
+    return h_valley * charge * efficiency_ch
+
+
+def battery_operating_cost(load_peak, power_valley, price_peak, price_valley, h_peak, h_valley, efficiency_ch,
+                           efficiency_disch, length, voltage, resistivity=18, area=25):
+    """Annual cost [NOK] of the energy and the losses on the existing line when the battery
+    keeps the grid import constant (o_total_bat of problem 2)"""
+    discharge, _ = battery_power(load_peak, power_valley, h_peak, h_valley, efficiency_ch, efficiency_disch)
+    load = load_peak - discharge
+    price_day = price_peak * h_peak + price_valley * h_valley
+    losses = loss_power(resistance(length, area, resistivity), load, voltage)
+    return 365 * (load + losses) * price_day
+
+
+def payment_factor(rate, lifetime, additional=0.25):
+    """Annual cost [NOK] per NOK of initial payment to the taxi company. The battery is paid
+    again in year 5, 10 and 15 at 1 + additional, 1 + 2 additional and 1 + 3 additional
+    times the initial payment, and the payments are annualized over lifetime."""
+    return annuity(rate, lifetime) * (
+        1 + (1 + additional) / annuity(rate, 5) + (1 + 2 * additional) / annuity(rate, 10)
+        + (1 + 3 * additional) / annuity(rate, 15))
+
+
+def max_battery_payment(reference_cost, rate, lifetime, additional=0.25):
+    """Maximum initial payment f_max_bat [NOK] to the taxi company.
+
+    reference_cost is the total annual cost of the reference line (c_90_total); as in
+    problem 2 the payments alone are compared with it.
+    """
+    return reference_cost / payment_factor(rate, lifetime, additional)
+
+
+def problem2(**overrides):
+    """The results of problem 2, for the PROBLEM2 data with the given overrides"""
+    d = dict(PROBLEM2, **overrides)
+    load_peak = d["power_peak"] + d["p_ch_car"] * d["n_ch_points"]
+    prices = (d["price_peak"], d["price_valley"], d["h_peak"], d["h_valley"])
+    line = (d["length"], d["voltage"], d["rate"], d["lifetime"], d["resistivity"])
+
+    area_25, current_25, _ = CONDUCTORS["FeAl25"]
+    area_75, _, investment_75 = CONDUCTORS["FeAl75"]
+    area_90, _, investment_90 = CONDUCTORS["FeAl90"]
+    cost_75 = annual_line_cost(investment_75, area_75, load_peak, d["power_valley"], *prices, *line)
+    cost_90 = annual_line_cost(investment_90, area_90, load_peak, d["power_valley"], *prices, *line)
+    slope = (investment_90 - investment_75) / (area_90 - area_75)
+
+    # Reference: FeAl90 including the cost of the delivered energy
+    cost_90_total = cost_90 + annual_energy_cost(load_peak, d["power_valley"], *prices)
+    battery = (d["efficiency_ch"], d["efficiency_disch"], d["length"], d["voltage"], d["resistivity"], area_25)
+    return {
+        "power_load_peak": load_peak,
+        "power_excess": load_peak - line_capacity(d["voltage"], current_25),
+        "cost_75": cost_75,
+        "cost_90": cost_90,
+        "optimal_cross_section": optimal_cross_section(slope, load_peak, d["power_valley"], *prices, *line),
+        "battery_capacity": battery_capacity(load_peak, d["power_valley"], d["h_peak"], d["h_valley"],
+                                             d["efficiency_ch"], d["efficiency_disch"]),
+        "cost_90_total": cost_90_total,
+        "battery_operating_cost": battery_operating_cost(load_peak, d["power_valley"], *prices, *battery),
+        "f_max_bat": max_battery_payment(cost_90_total, d["rate"], d["lifetime"]),
+    }
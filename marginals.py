@@ -0,0 +1,87 @@
+"""Marginal prices and their ranging from one solve of the dispatch LP
+
+Instead of re-solving with the load, the NOx cap or a limit nudged to see what one more
+unit costs, the dispatch LP of dispatch_lp.build_dispatch_lp is solved once with HiGHS
+and all duals are read in bulk: the hourly system marginal price (demand rows), the
+NOx shadow price, the duals of the production limits (variable upper bounds) and the
+reduced costs. HiGHS ranging gives for every dual the interval of the right-hand side
+(load, NOx cap, limit) over which it stays valid, and for every variable cost the
+interval over which the dispatch stays optimal.
+
+    result = solve_marginals(build_dispatch_lp(**TASK4))
+    result.price, result.price_range, result.nox_price, result.nox_range
+"""
+import highspy
+import numpy as np
+
+
+class MarginalResult:
+    """Solution, duals and ranging of a DispatchLP. Duals are the change of the total
+    cost per unit of right-hand side ([EUR/MWh], [EUR/ton], [EUR/MW]); ranges are
+    (low, high) intervals in the last axis."""
+
+    def __init__(self, lp, objective, dispatch, price, price_range, nox_price, nox_range, limit_duals,
+                 limit_range, reduced_costs, cost_range):
+        self.lp = lp
+        self.objective = objective          # [EUR] including fixed costs
+        self.dispatch = dispatch            # [MW] hours x modes
+        self.price = price                  # [EUR/MWh] demand duals per hour
+        self.price_range = price_range      # [MW] load of every hour over which its price holds
+        self.nox_price = nox_price          # [EUR/ton] NOx cap dual (<= 0), NaN without a cap
+        self.nox_range = nox_range          # [tons] NOx cap over which nox_price holds
+        self.limit_duals = limit_duals      # [EUR/MW] production limit duals (<= 0), hours x modes
+        self.limit_range = limit_range      # [MW] limit over which each limit dual holds
+        self.reduced_costs = reduced_costs  # [EUR/MWh] hours x modes, without the limit duals
+        self.cost_range = cost_range        # [EUR/MWh] variable cost over which the dispatch stays optimal
+
+
+def _ranging(values, n):
+    return np.array(values.value_[:n], dtype=float)
+
+
+def solve_marginals(lp, **options):
+    """Solve a dispatch_lp.DispatchLP with HiGHS and return its duals and ranging as a
+    MarginalResult; options are HiGHS options"""
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    for name, value in options.items():
+        h.setOptionValue(name, value)
+
+    n = len(lp.c)
+    h.addVars(n, np.zeros(n), np.asarray(lp.upper, dtype=float))
+    h.changeColsCost(n, np.arange(n, dtype=np.int32), np.asarray(lp.c, dtype=float))
+    rows = [(lp.A_eq.tocsr(), lp.b_eq, lp.b_eq)]
+    if lp.A_ub is not None:
+        rows.append((lp.A_ub.tocsr(), np.full(len(lp.b_ub), -highspy.kHighsInf), lp.b_ub))
+    for matrix, lower, upper in rows:
+        h.addRows(matrix.shape[0], np.asarray(lower, dtype=float), np.asarray(upper, dtype=float), matrix.nnz,
+                  matrix.indptr.astype(np.int32), matrix.indices.astype(np.int32), matrix.data.astype(float))
+    h.run()
+    if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+        raise RuntimeError(f"Dispatch LP not solved: {h.modelStatusToString(h.getModelStatus())}")
+
+    solution = h.getSolution()
+    status, ranging = h.getRanging()
+    if status != highspy.HighsStatus.kOk:
+        raise RuntimeError("HiGHS ranging failed")
+    shape = (lp.n_hours, len(lp.modes))
+    row_dual = np.array(solution.row_dual)
+    col_dual = np.array(solution.col_dual).reshape(shape)
+    m = len(row_dual)
+    row_range = np.column_stack([_ranging(ranging.row_bound_dn, m), _ranging(ranging.row_bound_up, m)])
+    col_range = np.stack([_ranging(ranging.col_bound_dn, n), _ranging(ranging.col_bound_up, n)], axis=-1)
+    cost_range = np.stack([_ranging(ranging.col_cost_dn, n), _ranging(ranging.col_cost_up, n)], axis=-1)
+
+    n_hours = lp.n_hours
+    has_nox = lp.A_ub is not None
+    # A negative column dual is the dual of the upper bound, the production limit; the
+    # rest is the reduced cost, as in the Pyomo model where the limits are constraints
+    limit_duals = np.minimum(col_dual, 0)
+    return MarginalResult(
+        lp, h.getInfo().objective_function_value + lp.constant,
+        np.array(solution.col_value).reshape(shape),
+        row_dual[:n_hours], row_range[:n_hours],
+        float(row_dual[n_hours]) if has_nox else np.nan,
+        row_range[n_hours] if has_nox else np.full(2, np.nan),
+        limit_duals, col_range.reshape(shape + (2,)),
+        col_dual - limit_duals, cost_range.reshape(shape + (2,)))
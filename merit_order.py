@@ -0,0 +1,142 @@
+"""Merit-order dispatch for the time-decoupled dispatch models
+
+When the hours are not linked (tasks 1, 5, 6, 7 and 8), every hour is filled from the
+cheapest mode upwards, so the LP has a closed-form solution: sort the modes by marginal
+cost, take the cumulative capacity and find the marginal mode of every hour with a
+single searchsorted. Models with coupling (storage, NOx cap, integer sizing) are passed
+on to the LP solver unchanged.
+"""
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.repn import generate_standard_repn
+
+import instrumentation
+from dispatch_lp import hour_array, mode_array
+from extract import limits_array
+
+DISPATCH_VARIABLES = ("power_producers", "power_production")
+DECOUPLED_CONSTRAINTS = {"production_limit_constraint", "demand_constraint"}
+
+
+class MeritOrderResult:
+    """Merit-order solution, with the same layout as dispatch_lp.DispatchResult"""
+
+    def __init__(self, modes, objective, dispatch, marginal_price):
+        self.modes = list(modes)
+        self.objective = objective            # [EUR] including fixed costs
+        self.dispatch = dispatch              # [MW] hours x modes
+        self.marginal_price = marginal_price  # [EUR/MWh] cost of the marginal mode per hour
+
+
+def merit_order_dispatch(load_demand, costs_variable, max_limits, modes=None, costs_fixed=None,
+                         co2_emissions=None, cost_co2=0):
+    """Dispatch all hours at once by merit order.
+
+    Takes the same arguments as dispatch_lp.build_dispatch_lp (without the NOx cap) and
+    returns a MeritOrderResult. The marginal price of an hour is the marginal cost of the
+    mode that covers the last MW of load, which is the demand dual of the LP.
+    """
+    if modes is None:
+        modes = list(costs_variable)
+    load = np.asarray(load_demand, dtype=float)
+    n_hours, n_modes = len(load), len(modes)
+
+    costs = mode_array(costs_variable, modes, n_hours)
+    if co2_emissions is not None:
+        costs = costs + hour_array(cost_co2, n_hours)[:, None] * mode_array(co2_emissions, modes, n_hours)
+    limits = mode_array(max_limits, modes, n_hours)
+
+    # Sort once when the costs are the same every hour, otherwise per hour
+    if (costs == costs[0]).all():
+        order = np.broadcast_to(np.argsort(costs[0], kind="stable"), (n_hours, n_modes))
+    else:
+        order = np.argsort(costs, axis=1, kind="stable")
+    sorted_costs = np.take_along_axis(costs, order, axis=1)
+    sorted_limits = np.take_along_axis(limits, order, axis=1)
+
+    capacity = np.cumsum(sorted_limits, axis=1)
+    if (capacity[:, -1] < load - 1e-9).any():
+        hour = int(np.argmax(capacity[:, -1] < load - 1e-9))
+        raise RuntimeError(f"Merit-order dispatch infeasible: load exceeds capacity in hour {hour}")
+    sorted_dispatch = np.clip(load[:, None] - (capacity - sorted_limits), 0, sorted_limits)
+
+    # One searchsorted over all hours: shift every row of the cumulative capacity so the
+    # rows stay sorted when flattened
+    offset = np.arange(n_hours) * (capacity[:, -1].max() + 1)
+    flat = (capacity + offset[:, None]).ravel()
+    marginal = np.searchsorted(flat, load + offset - 1e-9) - np.arange(n_hours) * n_modes
+    marginal = np.minimum(marginal, n_modes - 1)
+    marginal_price = sorted_costs[np.arange(n_hours), marginal]
+
+    dispatch = np.empty_like(sorted_dispatch)
+    np.put_along_axis(dispatch, order, sorted_dispatch, axis=1)
+
+    objective = float((costs * dispatch).sum())
+    if costs_fixed is not None:
+        objective += float(mode_array(costs_fixed, modes, n_hours).sum())
+    return MeritOrderResult(modes, objective, dispatch, marginal_price)
+
+
+def dispatch_variable(model):
+    """Return the power_producers / power_production variable of a task model"""
+    for name in DISPATCH_VARIABLES:
+        var = model.component(name)
+        if var is not None:
+            return var
+    return None
+
+
+def is_time_decoupled(model):
+    """Check if a task model is a plain hourly dispatch without links between the hours.
+
+    True when the only variable is the continuous dispatch variable, the only constraints
+    are the production limits and the hourly demand balance, and the objective is linear.
+    Storage (extra variables and constraints), a NOx cap (extra constraint) and integer
+    unit sizing (integer variables, bilinear objective) all make this False.
+    """
+    var = dispatch_variable(model)
+    if var is None:
+        return False
+    variables = list(model.component_objects(pyo.Var, active=True))
+    if len(variables) != 1 or not all(v.is_continuous() for v in var.values()):
+        return False
+    constraints = {c.local_name for c in model.component_objects(pyo.Constraint, active=True)}
+    if constraints != DECOUPLED_CONSTRAINTS:
+        return False
+    objective = next(model.component_data_objects(pyo.Objective, active=True))
+    return objective.sense == pyo.minimize and generate_standard_repn(objective.expr).is_linear()
+
+
+def model_costs(model, var):
+    """Read the objective coefficients of var as an hours x modes array plus the constant term"""
+    objective = next(model.component_data_objects(pyo.Objective, active=True))
+    repn = generate_standard_repn(objective.expr, compute_values=True)
+    position = {id(v): i for i, v in enumerate(var.values())}
+    costs = np.zeros(len(position))
+    for v, coef in zip(repn.linear_vars, repn.linear_coefs):
+        costs[position[id(v)]] += coef
+    return costs.reshape(len(model.hours), len(model.modes)), pyo.value(repn.constant)
+
+
+def solve(model, opt, **kwargs):
+    """Solve a task model, by merit order when the hours are independent.
+
+    Drop-in replacement for opt.solve(model, load_solutions=True): the solution is loaded
+    into the model in both cases. Returns a MeritOrderResult (with the hourly marginal
+    price) for decoupled models and the solver results otherwise.
+    """
+    if not is_time_decoupled(model):
+        return instrumentation.solve(opt, model, **kwargs)
+
+    with instrumentation.phase("solve"):
+        var = dispatch_variable(model)
+        modes = list(model.modes)
+        costs, constant = model_costs(model, var)
+        load = np.fromiter((pyo.value(model.load_demand[hour]) for hour in model.hours), dtype=float)
+        limits = limits_array(model)
+
+        result = merit_order_dispatch(load, costs, limits, modes=modes)
+        result.objective += constant
+    with instrumentation.phase("load"):
+        var.set_values(dict(zip(var.keys(), result.dispatch.ravel().tolist())))
+    return result
@@ -0,0 +1,507 @@
+"""Pyomo model builders for the hourly dispatch tasks
+
+Same formulations as the problem3_task*.py scripts, but built from arguments so the
+models can be reused for sweeps and benchmarks. Data that scenarios change (load,
+variable costs, CO2 cost, production limits) are mutable parameters, so one built model
+can be re-solved for many scenarios.
+
+Generator data is read from a fleet.Fleet: costs, emission factors and constant limits
+are indexed by mode only, and only the limits of the profiled modes (wind, solar) are
+indexed by hour, in max_profiles[hour, mode]. Variable costs and emission factors that
+vary by hour (Fleet.hourly) are indexed by hour and mode, as in the task scripts.
+"""
+import numpy as np
+import pyomo.environ as pyo
+
+from dispatch_lp import hour_array, mode_array
+from fleet import Fleet, hourly_values, mode_values, varies_by_hour
+
+
+def indexed_values(array, hours, modes):
+    """Dict {(hour, mode): value} from an hours x modes array, for Param initialize"""
+    return {(hour, mode): value
+            for hour, row in zip(hours, array.tolist())
+            for mode, value in zip(modes, row)}
+
+
+def make_fleet(fleet, n_hours, costs_variable, max_limits, modes=None, costs_fixed=None, co2_emissions=None,
+               nox_emissions=None, hourly=()):
+    """The fleet passed to a builder, or one built from its dict arguments"""
+    if fleet is None:
+        fleet = Fleet.from_dicts(costs_variable, max_limits, modes, costs_fixed, co2_emissions, nox_emissions,
+                                 n_hours, hourly)
+    if fleet.n_hours is not None and fleet.n_hours != n_hours:
+        raise ValueError(f"Fleet profiles have {fleet.n_hours} hours, the load has {n_hours}")
+    return fleet
+
+
+def add_mode_param(model, fleet, name, mutable=False):
+    """Declare the fleet field name as a Param indexed by mode, or by hour and mode when
+    it varies by hour"""
+    if name in fleet.hourly:
+        param = pyo.Param(model.hours, model.modes, mutable=mutable, domain=pyo.NonNegativeReals,
+                          initialize=indexed_values(fleet.hourly[name], model.hours, fleet.modes))
+    else:
+        param = pyo.Param(model.modes, mutable=mutable, domain=pyo.NonNegativeReals,
+                          initialize=dict(zip(fleet.modes, getattr(fleet, name).tolist())))
+    model.add_component(name, param)
+
+
+def mode_value(model, name, hour, mode):
+    """Value of the Param name of mode in hour, whether it is indexed by mode or by hour and mode"""
+    param = getattr(model, name)
+    return param[hour, mode] if param.dim() == 2 else param[mode]
+
+
+def add_fleet_params(model, fleet, mutable=True):
+    """Declare costs_fixed, costs_variable and max_limits per mode, and the hourly limits
+    of the profiled modes as max_profiles[hour, mode]"""
+    modes = fleet.modes
+    model.costs_fixed = pyo.Param(model.modes, initialize=dict(zip(modes, fleet.costs_fixed.tolist())),
+                                  domain=pyo.NonNegativeReals)
+    add_mode_param(model, fleet, "costs_variable", mutable)
+    model.max_limits = pyo.Param(model.modes, mutable=mutable, domain=pyo.NonNegativeReals,
+                                 initialize=dict(zip(modes, fleet.max_limits.tolist())))
+    model.profile_modes = pyo.Set(initialize=fleet.profile_modes, within=model.modes)
+    profiles = {} if fleet.profiles is None else indexed_values(fleet.profiles, model.hours, fleet.profile_modes)
+    model.max_profiles = pyo.Param(model.hours, model.profile_modes, initialize=profiles, mutable=mutable,
+                                   domain=pyo.NonNegativeReals)
+
+
+def production_limit(model, hour, mode):
+    """Limit of mode in hour: its hourly profile if it has one, else its constant limit"""
+    if mode in model.profile_modes:
+        return model.max_profiles[hour, mode]
+    return model.max_limits[mode]
+
+
+def build_dispatch_model(load_demand, costs_variable=None, max_limits=None, modes=None, costs_fixed=None,
+                         co2_emissions=None, cost_co2=0, nox_emissions=None, nox_limit=None,
+                         duals=False, fleet=None, hourly=()):
+    """Build the dispatch model of tasks 1 and 3-8.
+
+    Arguments take the same shapes as in the task scripts (see fleet.Fleet.from_dicts),
+    profiles can also be float64 arrays such as the columns of timeseries.Profiles.
+    Instead of the generator arguments a fleet.Fleet can be passed as fleet.
+    With nox_limit the total NOx emissions are capped as in task 4, with duals=True the
+    solver duals and reduced costs are imported into model.dual and model.rc (see
+    extract.marginal_prices). hourly names fields to index by hour even when they are
+    constant (see Fleet.from_dicts), so set_mode_values can store hourly values later.
+    """
+    n_hours = len(load_demand)
+    fleet = make_fleet(fleet, n_hours, costs_variable, max_limits, modes, costs_fixed, co2_emissions, nox_emissions,
+                       hourly)
+    modes = fleet.modes
+
+    # Declare the model
+    model = pyo.ConcreteModel()
+
+    # Declare sets
+    model.modes = pyo.Set(initialize=modes)
+    model.hours = pyo.RangeSet(0, n_hours - 1)
+
+    # Declare model parameters
+    model.load_demand = pyo.Param(model.hours, initialize=hour_array(load_demand, n_hours), mutable=True)
+    add_fleet_params(model, fleet)
+    add_mode_param(model, fleet, "co2_emissions")
+    model.cost_co2 = pyo.Param(model.hours, initialize=hour_array(cost_co2, n_hours), mutable=True)
+
+    # Declare model variables
+    model.power_production = pyo.Var(model.hours, model.modes, within=pyo.NonNegativeReals)
+
+    # Declare objective
+    def objective(model):
+        return sum(
+            sum(model.costs_fixed[mode]
+                + mode_value(model, "costs_variable", hour, mode) * model.power_production[hour, mode]
+                + model.cost_co2[hour] * mode_value(model, "co2_emissions", hour, mode)
+                * model.power_production[hour, mode]
+                for mode in model.modes)
+            for hour in model.hours)
+    model.objective = pyo.Objective(rule=objective, sense=pyo.minimize)
+
+    # Declare constraints
+    def production_limits(model, hour, mode):
+        return model.power_production[hour, mode] <= production_limit(model, hour, mode)
+    model.production_limit_constraint = pyo.Constraint(model.hours, model.modes, rule=production_limits)
+
+    def demand(model, hour):
+        return sum(model.power_production[hour, mode] for mode in model.modes) == model.load_demand[hour]
+    model.demand_constraint = pyo.Constraint(model.hours, rule=demand)
+
+    if nox_limit is not None:
+        add_mode_param(model, fleet, "nox_emissions")
+        model.nox_limit = pyo.Param(initialize=nox_limit, mutable=True)
+
+        def nox_limits(model):
+            return sum(model.power_production[hour, mode] * mode_value(model, "nox_emissions", hour, mode)
+                       for hour in model.hours for mode in model.modes) <= model.nox_limit
+        model.nox_emission_constraint = pyo.Constraint(rule=nox_limits)
+
+    if duals:
+        model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+        model.rc = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+    return model
+
+
+def accepts_mode_values(model, name, values):
+    """Whether set_mode_values can store values into the parameter name of model: hourly
+    values need a parameter indexed by hour (for max_limits, profiled modes)"""
+    modes = list(model.modes)
+    if name == "max_limits":
+        limits = mode_array(values, modes, len(model.hours))
+        return not np.ptp(limits[:, ~np.isin(modes, list(model.profile_modes))], axis=0).any()
+    return getattr(model, name).dim() == 2 or not varies_by_hour(values, modes)
+
+
+def set_mode_values(model, name, values):
+    """Store per-mode values into the mutable per-mode parameter name.
+
+    Hourly values need a parameter indexed by hour and mode (build the model with
+    hourly=(name,)). For max_limits the hourly profiles of the profiled modes are stored
+    into max_profiles; the other modes must get constant limits.
+    """
+    modes = list(model.modes)
+    if not accepts_mode_values(model, name, values):
+        raise ValueError(f"{name} varies by hour for modes this model keeps constant, "
+                         f"build it with hourly=({name!r},)")
+    if name != "max_limits":
+        param = getattr(model, name)
+        if param.dim() == 2:
+            param.store_values(indexed_values(hourly_values(values, modes, len(model.hours)), model.hours, modes))
+        else:
+            param.store_values(dict(zip(modes, mode_values(values, modes, name).tolist())))
+        return
+    hours, profile_modes = list(model.hours), list(model.profile_modes)
+    limits = mode_array(values, modes, len(hours))
+    profiled = np.isin(modes, profile_modes)
+    model.max_profiles.store_values(indexed_values(limits[:, profiled], hours, profile_modes))
+    model.max_limits.store_values(dict(zip(modes, limits.max(axis=0).tolist())))
+
+
+def set_hour_values(model, name, values):
+    """Store a scalar or hourly profile into the mutable hourly parameter name"""
+    hours = list(model.hours)
+    getattr(model, name).store_values(dict(zip(hours, hour_array(values, len(hours)).tolist())))
+
+
+def build_battery_model(load_demand, costs_variable=None, max_limits=None, modes=None, costs_fixed=None,
+                        battery_rate_max=25, battery_storage_max=100, soc_initial=0,
+                        efficiency_ch=0.95, efficiency_disch=0.95, binary=True, fleet=None, hourly=()):
+    """Build the battery model of task 2.
+
+    modes must include "battery", whose production is the battery discharge. The battery
+    starts the horizon with soc_initial [MWh] (empty in task 2); soc_initial, load_demand,
+    costs_variable and max_limits are mutable so the model can be reused for other windows.
+    With binary=False the charge_this_hour / discharge_this_hour binaries and the C2-C4
+    constraints are left out and the model is a pure LP (see storage.py); the default
+    0.95 efficiencies make charging and discharging at once a loss. With both at 1 (the
+    lossless battery of task 2) only the discharge cost prevents it, and the binary
+    fallback of storage.solve_battery is needed. hourly is passed to Fleet.from_dicts as
+    in build_dispatch_model.
+    """
+    n_hours = len(load_demand)
+    fleet = make_fleet(fleet, n_hours, costs_variable, max_limits, modes, costs_fixed, hourly=hourly)
+    modes = fleet.modes
+
+    # Declare the model
+    model = pyo.ConcreteModel()
+
+    # Declare sets
+    model.modes = pyo.Set(initialize=modes)
+    model.hours = pyo.RangeSet(0, n_hours - 1)
+
+    # Declare model parameters
+    model.load_demand = pyo.Param(model.hours, initialize=hour_array(load_demand, n_hours), mutable=True)
+    add_fleet_params(model, fleet)
+
+    model.battery_rate_max = pyo.Param(initialize=battery_rate_max, doc="Max power flow in or out [MW]")
+    model.battery_storage_max = pyo.Param(initialize=battery_storage_max, doc="Max storage (MWh)")
+    model.soc_initial = pyo.Param(initialize=soc_initial, mutable=True, doc="State of charge before the first hour (MWh)")
+    model.efficiency_ch = pyo.Param(initialize=efficiency_ch, doc="Charging efficiency")
+    model.efficiency_disch = pyo.Param(initialize=efficiency_disch, doc="Discharging efficiency")
+
+    # Declare model variables
+    model.power_production = pyo.Var(model.hours, model.modes, within=pyo.NonNegativeReals)
+
+    ### battery variables
+    model.Ein = pyo.Var(model.hours, bounds=(0, model.battery_rate_max))
+    model.Eout = pyo.Var(model.hours, bounds=(0, model.battery_rate_max))
+    model.SOC = pyo.Var(model.hours, bounds=(0, model.battery_storage_max))  # State of charge
+    if binary:
+        model.charge_this_hour = pyo.Var(model.hours, within=pyo.Binary)
+        model.discharge_this_hour = pyo.Var(model.hours, within=pyo.Binary)
+
+    # Declare objective
+    def objective(model):
+        return sum(
+            sum(model.costs_fixed[mode]
+                + mode_value(model, "costs_variable", hour, mode) * model.power_production[hour, mode]
+                for mode in model.modes)
+            for hour in model.hours)
+    model.objective = pyo.Objective(rule=objective, sense=pyo.minimize)
+
+    # Declare constraints
+    def production_limits(model, hour, mode):
+        return model.power_production[hour, mode] <= production_limit(model, hour, mode)
+    model.production_limit_constraint = pyo.Constraint(model.hours, model.modes, rule=production_limits)
+
+    def demand(model, hour):
+        return sum(model.power_production[hour, mode] for mode in model.modes) == model.load_demand[hour] + model.Ein[hour]
+    model.demand_constraint = pyo.Constraint(model.hours, rule=demand)
+
+    ### battery constraints
+    def previous_soc(model, hour):
+        if hour == model.hours.first():
+            return model.soc_initial
+        return model.SOC[hour - 1]
+
+    def storage_state(model, hour):
+        """Storage changes with flows in/out"""
+        return model.SOC[hour] == (previous_soc(model, hour)
+                                   + model.efficiency_ch * model.Ein[hour]
+                                   - model.Eout[hour] / model.efficiency_disch)
+    model.charge_state = pyo.Constraint(model.hours, rule=storage_state)
+
+    def positive_charge(model, hour):
+        """Limit discharge to the amount of charge in battery"""
+        return model.Eout[hour] / model.efficiency_disch <= previous_soc(model, hour)
+    model.positive_charge = pyo.Constraint(model.hours, rule=positive_charge)
+
+    def battery_output(model, hour):
+        return model.Eout[hour] == model.power_production[hour, "battery"]
+    model.C1 = pyo.Constraint(model.hours, rule=battery_output)
+
+    if not binary:
+        return model
+
+    def charge_or_discharge(model, hour):
+        return model.charge_this_hour[hour] + model.discharge_this_hour[hour] <= 1
+    model.C2 = pyo.Constraint(model.hours, rule=charge_or_discharge)
+
+    def charge_only_when_charging(model, hour):
+        return model.Ein[hour] <= model.battery_rate_max * model.charge_this_hour[hour]
+    model.C3 = pyo.Constraint(model.hours, rule=charge_only_when_charging)
+
+    def discharge_only_when_discharging(model, hour):
+        return model.Eout[hour] <= model.battery_rate_max * model.discharge_this_hour[hour]
+    model.C4 = pyo.Constraint(model.hours, rule=discharge_only_when_discharging)
+    return model
+
+
+def build_sizing_model(load_demand, costs_variable=None, max_limits=None, max_unit_counts=None, modes=None,
+                       costs_fixed=None, co2_emissions=None, cost_co2=0, linearized=True, fleet=None,
+                       hour_weights=None):
+    """Build the unit sizing model of task 9.
+
+    max_limits is the production limit of one unit. With linearized=False this is the
+    task 9 formulation, where power_production[hour, mode] (per unit) is multiplied by the
+    integer production_unit_count[mode]; it is nonconvex and needs a solver like Gurobi.
+    With linearized=True (default) the variable is power_output[hour, mode], the output of
+    all units of a mode together, which turns the model into an exact MILP: every unit
+    count is at least one, so power_production = power_output / production_unit_count.
+    hour_weights gives the number of hours every modelled hour stands for in the objective
+    (1 by default), e.g. the days in the cluster of a representative day (see clustering.py).
+    """
+    n_hours = len(load_demand)
+    fleet = make_fleet(fleet, n_hours, costs_variable, max_limits, modes, costs_fixed, co2_emissions)
+    modes = fleet.modes
+
+    # Declare the model
+    model = pyo.ConcreteModel()
+
+    # Declare sets
+    model.modes = pyo.Set(initialize=modes)
+    model.hours = pyo.RangeSet(0, n_hours - 1)
+
+    # Declare model parameters
+    model.load_demand = pyo.Param(model.hours, initialize=hour_array(load_demand, n_hours))
+    add_fleet_params(model, fleet, mutable=False)
+    add_mode_param(model, fleet, "co2_emissions")
+    model.cost_co2 = pyo.Param(model.hours, initialize=hour_array(cost_co2, n_hours))
+    model.hour_weights = pyo.Param(model.hours, initialize=hour_array(1 if hour_weights is None else hour_weights,
+                                                                      n_hours), domain=pyo.NonNegativeReals)
+    model.max_unit_counts = pyo.Param(model.modes, initialize={mode: int(max_unit_counts[mode]) for mode in modes},
+                                      domain=pyo.PositiveIntegers)
+
+    # Declare model variables
+    model.production_unit_count = pyo.Var(model.modes, within=pyo.PositiveIntegers)
+
+    def unit_count(model, mode):
+        return model.production_unit_count[mode] <= model.max_unit_counts[mode]
+    model.unit_count_constraint = pyo.Constraint(model.modes, rule=unit_count)
+
+    def marginal_cost(model, hour, mode):
+        return (mode_value(model, "costs_variable", hour, mode)
+                + model.cost_co2[hour] * mode_value(model, "co2_emissions", hour, mode))
+
+    if not linearized:
+        model.power_production = pyo.Var(model.hours, model.modes, within=pyo.NonNegativeReals)
+
+        # Declare objective
+        def objective(model):
+            return sum(
+                sum(model.hour_weights[hour] * (model.costs_fixed[mode]
+                                                + marginal_cost(model, hour, mode) * model.power_production[hour, mode])
+                    for hour in model.hours)
+                * model.production_unit_count[mode] for mode in model.modes)
+        model.objective = pyo.Objective(rule=objective, sense=pyo.minimize)
+
+        # Declare constraints
+        def production_limits(model, hour, mode):
+            return model.power_production[hour, mode] <= production_limit(model, hour, mode)
+        model.production_limit_constraint = pyo.Constraint(model.hours, model.modes, rule=production_limits)
+
+        def demand(model, hour):
+            return sum(model.power_production[hour, mode] * model.production_unit_count[mode]
+                       for mode in model.modes) == model.load_demand[hour]
+        model.demand_constraint = pyo.Constraint(model.hours, rule=demand)
+        return model
+
+    model.power_output = pyo.Var(model.hours, model.modes, within=pyo.NonNegativeReals)
+
+    # Declare objective
+    total_weight = float(sum(model.hour_weights[hour] for hour in model.hours))
+
+    def objective(model):
+        return sum(
+            total_weight * model.costs_fixed[mode] * model.production_unit_count[mode]
+            + sum(model.hour_weights[hour] * marginal_cost(model, hour, mode) * model.power_output[hour, mode]
+                  for hour in model.hours)
+            for mode in model.modes)
+    model.objective = pyo.Objective(rule=objective, sense=pyo.minimize)
+
+    # Declare constraints
+    def production_limits(model, hour, mode):
+        return model.power_output[hour, mode] <= production_limit(model, hour, mode) * model.production_unit_count[mode]
+    model.production_limit_constraint = pyo.Constraint(model.hours, model.modes, rule=production_limits)
+
+    def demand(model, hour):
+        return sum(model.power_output[hour, mode] for mode in model.modes) == model.load_demand[hour]
+    model.demand_constraint = pyo.Constraint(model.hours, rule=demand)
+    return model
+
+
+def build_unit_commitment_model(load_demand, costs_variable=None, max_limits=None, modes=None, costs_fixed=None,
+                                startup_costs=None, min_stable=None, min_up=None, min_down=None,
+                                initial_status=None, co2_emissions=None, cost_co2=0, value_of_lost_load=None,
+                                fleet=None):
+    """Build the dispatch model with unit commitment of the modes without a limit profile.
+
+    Every committed mode (coal, gas, nuclear, biomass: the modes whose max_limits is not
+    an hourly profile) is one unit with an on/off binary unit_on[hour, mode] and start-up
+    and shut-down indicators unit_start / unit_stop. Its costs_fixed is only paid in the
+    hours it is on, startup_costs [EUR] at every start, and it produces between
+    min_stable [MW] and max_limits when on. min_up / min_down [h] are enforced with the
+    tight start-up/shut-down window inequalities, which give the convex hull of the
+    on/off schedules of one unit, so the LP relaxation stays close to integral; with
+    unit_on binary the start and stop indicators are integral without being declared so.
+    initial_status [h] is how long each unit has been on (> 0) or off (< 0) before the
+    first hour; units are off for long enough by default. Profiled modes (wind, solar)
+    are dispatched as in build_dispatch_model. With value_of_lost_load [EUR/MWh] the
+    balance gets unserved_load and spilled_power at that cost, so the model stays
+    feasible when the minimum stable outputs and up/down times cannot follow the load.
+    """
+    n_hours = len(load_demand)
+    fleet = make_fleet(fleet, n_hours, costs_variable, max_limits, modes, costs_fixed, co2_emissions)
+    modes = fleet.modes
+    committed = [mode for mode, profiled in zip(modes, fleet.profiled) if not profiled]
+
+    def per_unit(values, default):
+        return {mode: default if values is None or mode not in values else values[mode] for mode in committed}
+
+    # Declare the model
+    model = pyo.ConcreteModel()
+
+    # Declare sets
+    model.modes = pyo.Set(initialize=modes)
+    model.committed_modes = pyo.Set(initialize=committed, within=model.modes)
+    model.hours = pyo.RangeSet(0, n_hours - 1)
+
+    # Declare model parameters
+    model.load_demand = pyo.Param(model.hours, initialize=hour_array(load_demand, n_hours), mutable=True)
+    add_fleet_params(model, fleet)
+    add_mode_param(model, fleet, "co2_emissions")
+    model.cost_co2 = pyo.Param(model.hours, initialize=hour_array(cost_co2, n_hours), mutable=True)
+    model.startup_costs = pyo.Param(model.committed_modes, initialize=per_unit(startup_costs, 0), mutable=True,
+                                    domain=pyo.NonNegativeReals)
+    model.min_stable = pyo.Param(model.committed_modes, initialize=per_unit(min_stable, 0), mutable=True,
+                                 domain=pyo.NonNegativeReals)
+    model.min_up = pyo.Param(model.committed_modes, initialize=per_unit(min_up, 1), domain=pyo.PositiveIntegers)
+    model.min_down = pyo.Param(model.committed_modes, initialize=per_unit(min_down, 1), domain=pyo.PositiveIntegers)
+    model.initial_status = pyo.Param(model.committed_modes, initialize=per_unit(initial_status, -n_hours),
+                                     domain=pyo.Integers)
+
+    # Declare model variables
+    model.power_production = pyo.Var(model.hours, model.modes, within=pyo.NonNegativeReals)
+    model.unit_on = pyo.Var(model.hours, model.committed_modes, within=pyo.Binary)
+    model.unit_start = pyo.Var(model.hours, model.committed_modes, bounds=(0, 1))
+    model.unit_stop = pyo.Var(model.hours, model.committed_modes, bounds=(0, 1))
+    if value_of_lost_load is not None:
+        model.value_of_lost_load = pyo.Param(initialize=value_of_lost_load, mutable=True,
+                                             domain=pyo.NonNegativeReals)
+        model.unserved_load = pyo.Var(model.hours, within=pyo.NonNegativeReals)
+        model.spilled_power = pyo.Var(model.hours, within=pyo.NonNegativeReals)
+
+    # Units still within their minimum up or down time at the start keep their status
+    for mode in committed:
+        status = model.initial_status[mode]
+        remaining = model.min_up[mode] - status if status > 0 else model.min_down[mode] + status
+        for hour in range(min(max(remaining, 0), n_hours)):
+            model.unit_on[hour, mode].fix(1 if status > 0 else 0)
+
+    # Declare objective
+    def objective(model):
+        return sum(
+            sum(model.costs_fixed[mode] * (model.unit_on[hour, mode] if mode in model.committed_modes else 1)
+                + (mode_value(model, "costs_variable", hour, mode)
+                   + model.cost_co2[hour] * mode_value(model, "co2_emissions", hour, mode))
+                * model.power_production[hour, mode]
+                for mode in model.modes)
+            + sum(model.startup_costs[mode] * model.unit_start[hour, mode] for mode in model.committed_modes)
+            + (model.value_of_lost_load * (model.unserved_load[hour] + model.spilled_power[hour])
+               if value_of_lost_load is not None else 0)
+            for hour in model.hours)
+    model.objective = pyo.Objective(rule=objective, sense=pyo.minimize)
+
+    # Declare constraints
+    def production_limits(model, hour, mode):
+        if mode in model.committed_modes:
+            return model.power_production[hour, mode] <= model.max_limits[mode] * model.unit_on[hour, mode]
+        return model.power_production[hour, mode] <= production_limit(model, hour, mode)
+    model.production_limit_constraint = pyo.Constraint(model.hours, model.modes, rule=production_limits)
+
+    def stable_production(model, hour, mode):
+        return model.power_production[hour, mode] >= model.min_stable[mode] * model.unit_on[hour, mode]
+    model.min_stable_constraint = pyo.Constraint(model.hours, model.committed_modes, rule=stable_production)
+
+    def demand(model, hour):
+        production = sum(model.power_production[hour, mode] for mode in model.modes)
+        if value_of_lost_load is not None:
+            production += model.unserved_load[hour] - model.spilled_power[hour]
+        return production == model.load_demand[hour]
+    model.demand_constraint = pyo.Constraint(model.hours, rule=demand)
+
+    def previous_on(model, hour, mode):
+        if hour == model.hours.first():
+            return 1 if model.initial_status[mode] > 0 else 0
+        return model.unit_on[hour - 1, mode]
+
+    def start_stop(model, hour, mode):
+        """A unit starts when it goes from off to on and stops when it goes from on to off"""
+        return (model.unit_on[hour, mode] - previous_on(model, hour, mode)
+                == model.unit_start[hour, mode] - model.unit_stop[hour, mode])
+    model.start_stop_constraint = pyo.Constraint(model.hours, model.committed_modes, rule=start_stop)
+
+    def min_up_time(model, hour, mode):
+        """A unit started in the last min_up hours is on"""
+        first = max(hour - model.min_up[mode] + 1, model.hours.first())
+        return sum(model.unit_start[h, mode] for h in range(first, hour + 1)) <= model.unit_on[hour, mode]
+    model.min_up_constraint = pyo.Constraint(model.hours, model.committed_modes, rule=min_up_time)
+
+    def min_down_time(model, hour, mode):
+        """A unit stopped in the last min_down hours is off"""
+        first = max(hour - model.min_down[mode] + 1, model.hours.first())
+        return sum(model.unit_stop[h, mode] for h in range(first, hour + 1)) <= 1 - model.unit_on[hour, mode]
+    model.min_down_constraint = pyo.Constraint(model.hours, model.committed_modes, rule=min_down_time)
+    return model
@@ -0,0 +1,220 @@
+"""Monte Carlo uncertainty analysis of the battery payment of problem 2
+
+The sensitivity section of problem2.py varies x, the discount rate and the peak price one
+at a time. Here all uncertain inputs are sampled jointly from configurable distributions
+and the battery economics are evaluated for millions of samples in chunks of NumPy
+arrays, so memory stays bounded whatever the number of samples:
+
+    result = simulate(n_samples=10 ** 6, seed=1)
+    result.quantiles["f_max_bat"], result.probability_positive, result.sobol_total["net_benefit"]
+
+Outputs per sample:
+    f_max_bat    maximum initial payment [NOK] as in problem2.py (payments against c_90_total)
+    f_max_net    maximum initial payment [NOK] when the cost of the energy and the losses on
+                 the existing line with the battery (o_total_bat) is also paid
+    net_benefit  annual saving [NOK] of the battery against FeAl90 for a given initial payment
+
+Sensitivities are the first order and total Sobol indices, estimated with the Saltelli
+(first order) and Jansen (total) estimators from two independent sample matrices A and B
+and the matrices AB_i (A with column i taken from B).
+"""
+import numpy as np
+
+from line_economics import PROBLEM2, battery_operating_cost, payment_factor, problem2
+
+# Input name: distribution, as (numpy Generator method, *parameters) or a fixed number.
+# additional is x in problem2.py, load_growth scales the load without the charging stations.
+DISTRIBUTIONS = {
+    "additional": ("triangular", 0.0, 0.25, 0.5),
+    "rate": ("triangular", 0.05, 0.085, 0.12),
+    "price_peak": ("normal", 325, 50),
+    "price_valley": ("normal", 210, 30),
+    "efficiency_ch": ("uniform", 0.90, 0.97),
+    "efficiency_disch": ("uniform", 0.88, 0.95),
+    "load_growth": ("normal", 1.0, 0.05),
+}
+
+OUTPUTS = ("f_max_bat", "f_max_net", "net_benefit")
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def evaluate(payment=None, **inputs):
+    """f_max_bat, f_max_net and net_benefit for inputs given as floats or arrays.
+
+    inputs are the DISTRIBUTIONS names (additional, load_growth) and PROBLEM2 names;
+    missing inputs take the PROBLEM2 data (additional 0.25, load_growth 1). payment is
+    the initial payment [NOK] of net_benefit, by default f_max_net of the PROBLEM2 data.
+    """
+    additional = inputs.pop("additional", 0.25)
+    growth = inputs.pop("load_growth", 1.0)
+    unknown = set(inputs) - set(PROBLEM2)
+    if unknown:
+        raise ValueError(f"Unknown inputs {sorted(unknown)}, expected {sorted(DISTRIBUTIONS)} or PROBLEM2 names")
+    if payment is None:
+        payment = nominal_payment()
+    d = dict(PROBLEM2, **inputs)
+    d["power_peak"] = d["power_peak"] * growth
+    d["power_valley"] = d["power_valley"] * growth
+    reference = problem2(**d)["cost_90_total"]
+    load_peak = d["power_peak"] + d["p_ch_car"] * d["n_ch_points"]
+    operating = battery_operating_cost(load_peak, d["power_valley"], d["price_peak"], d["price_valley"],
+                                       d["h_peak"], d["h_valley"], d["efficiency_ch"], d["efficiency_disch"],
+                                       d["length"], d["voltage"], d["resistivity"])
+    factor = payment_factor(d["rate"], d["lifetime"], additional)
+    return {
+        "f_max_bat": reference / factor,
+        "f_max_net": (reference - operating) / factor,
+        "net_benefit": reference - operating - payment * factor,
+    }
+
+
+def nominal_payment():
+    """f_max_net [NOK] of the PROBLEM2 data"""
+    return float(evaluate(payment=0.0)["f_max_net"])
+
+
+def sample(rng, distributions, n):
+    """n samples of every input as {name: array}"""
+    samples = {}
+    for name, spec in distributions.items():
+        if isinstance(spec, (int, float)):
+            samples[name] = np.full(n, float(spec))
+        else:
+            method, *parameters = spec
+            samples[name] = getattr(rng, method)(*parameters, size=n)
+    return samples
+
+
+class Histogram:
+    """Streaming quantiles: counts on a fine fixed grid set from the first chunk, plus
+    exact counts below and above the grid"""
+
+    def __init__(self, first, bins=2 ** 16):
+        low, high = np.min(first), np.max(first)
+        span = high - low or abs(high) or 1.0
+        self.edges = np.linspace(low - span, high + span, bins + 1)
+        self.counts = np.zeros(bins + 2, dtype=np.int64)
+        self.low, self.high = np.inf, -np.inf
+
+    def add(self, values):
+        index = np.searchsorted(self.edges, values, side="right")
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        self.low, self.high = min(self.low, values.min()), max(self.high, values.max())
+
+    def quantile(self, q):
+        # Grid with the outer bins closed at the smallest and largest sample
+        edges = np.concatenate([[min(self.low, self.edges[0])], self.edges, [max(self.high, self.edges[-1])]])
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)]) / self.counts.sum()
+        return np.interp(q, cumulative, edges[:len(cumulative)])
+
+
+class MonteCarloResult:
+    """Statistics of the outputs of simulate, each a dict {output: value}"""
+
+    def __init__(self, n_samples, inputs, mean, std, quantiles, probability_positive, sobol_first, sobol_total):
+        self.n_samples = n_samples                        # base samples (rows of A and of B)
+        self.inputs = inputs                              # names of the sampled inputs
+        self.mean = mean                                  # mean
+        self.std = std                                    # standard deviation
+        self.quantiles = quantiles                        # {q: value}
+        self.probability_positive = probability_positive  # P(net_benefit > 0)
+        self.sobol_first = sobol_first                    # {input: first order index}
+        self.sobol_total = sobol_total                    # {input: total index}
+
+    def summary(self):
+        """The statistics as a DataFrame with one row per output"""
+        import pandas as pd
+
+        rows = {}
+        for output in self.mean:
+            row = {"mean": self.mean[output], "std": self.std[output]}
+            row.update({f"q{q:g}": value for q, value in self.quantiles[output].items()})
+            row.update({f"S_{name}": value for name, value in self.sobol_first[output].items()})
+            row.update({f"ST_{name}": value for name, value in self.sobol_total[output].items()})
+            rows[output] = row
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def simulate(n_samples=10 ** 6, distributions=None, payment=None, seed=None, chunk_size=2 ** 16,
+             quantiles=QUANTILES, sensitivity=True, **fixed):
+    """Monte Carlo statistics of f_max_bat, f_max_net and net_benefit.
+
+    distributions overrides DISTRIBUTIONS entries (a fixed number removes an input from
+    the sampling), fixed overrides other PROBLEM2 data and payment is the initial payment
+    [NOK] of net_benefit (see evaluate). Samples are drawn and evaluated chunk_size at a
+    time; mean, standard deviation, quantiles and P(net_benefit > 0) use the 2 n_samples
+    rows of A and B, the Sobol indices another n_samples model runs per sampled input
+    (skipped with sensitivity=False).
+    """
+    distributions = dict(DISTRIBUTIONS, **(distributions or {}))
+    sampled = [name for name, spec in distributions.items() if not isinstance(spec, (int, float))]
+    if payment is None:
+        payment = nominal_payment()
+    rng = np.random.default_rng(seed)
+    n_outputs, n_inputs = len(OUTPUTS), len(sampled)
+
+    # Sums are taken of values minus the nominal outputs to keep the variance accurate
+    shift = np.array([evaluate(payment, **fixed)[output] for output in OUTPUTS])
+    total = np.zeros(n_outputs)
+    total_sq = np.zeros(n_outputs)
+    positive = 0
+    first = np.zeros((n_outputs, n_inputs))
+    total_effect = np.zeros((n_outputs, n_inputs))
+    histograms = None
+
+    def run(samples):
+        outputs = evaluate(payment, **fixed, **samples)
+        n = len(next(iter(samples.values())))
+        return np.stack([np.broadcast_to(outputs[output], (n,)) for output in OUTPUTS]) - shift[:, None]
+
+    for start in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - start)
+        a = sample(rng, distributions, n)
+        b = sample(rng, distributions, n)
+        y_a, y_b = run(a), run(b)
+        if sensitivity:
+            for i, name in enumerate(sampled):
+                y_ab = run(dict(a, **{name: b[name]}))
+                first[:, i] += np.einsum("ij,ij->i", y_b, y_ab - y_a)
+                total_effect[:, i] += np.einsum("ij,ij->i", y_a - y_ab, y_a - y_ab)
+        for y in (y_a, y_b):
+            total += y.sum(axis=1)
+            total_sq += np.einsum("ij,ij->i", y, y)
+            positive += int(np.count_nonzero(y[OUTPUTS.index("net_benefit")] + shift[-1] > 0))
+            values = y + shift[:, None]
+            if histograms is None:
+                histograms = [Histogram(row) for row in values]
+            for histogram, row in zip(histograms, values):
+                histogram.add(row)
+
+    count = 2 * n_samples
+    mean = total / count
+    variance = total_sq / count - mean ** 2
+    # Saltelli (2010) first order and Jansen total effect estimators
+    with np.errstate(invalid="ignore", divide="ignore"):
+        s_first = first / n_samples / variance[:, None]
+        s_total = total_effect / (2 * n_samples) / variance[:, None]
+
+    return MonteCarloResult(
+        n_samples, sampled,
+        mean={output: float(mean[k] + shift[k]) for k, output in enumerate(OUTPUTS)},
+        std={output: float(np.sqrt(max(variance[k], 0.0))) for k, output in enumerate(OUTPUTS)},
+        quantiles={output: dict(zip(quantiles, histograms[k].quantile(quantiles).tolist()))
+                   for k, output in enumerate(OUTPUTS)},
+        probability_positive=positive / count,
+        sobol_first={output: dict(zip(sampled, s_first[k].tolist())) if sensitivity else {}
+                     for k, output in enumerate(OUTPUTS)},
+        sobol_total={output: dict(zip(sampled, s_total[k].tolist())) if sensitivity else {}
+                     for k, output in enumerate(OUTPUTS)},
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    result = simulate(seed=1)
+    print(result.summary().T.to_string())
+    print(f"P(net benefit > 0) at {nominal_payment():.0f} NOK: {result.probability_positive:.3f}")
+    print(f"time: {time.perf_counter() - start:.2f} s")
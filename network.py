@@ -0,0 +1,382 @@
+"""Multi-bus dispatch with DC power flow and lazily added line limits
+
+The task models are copperplate: one demand row per hour. Here the modes and the loads
+sit on buses of a network and every line carries at most its thermal limit, taken
+from conductor data as in problem 2 (line_capacity of the voltage and the maximum
+current of the conductor, e.g. 255 A for FeAl25).
+
+Flows follow the DC power flow approximation: the flow of line l in an hour is
+PTDF[l] @ injections, with injections = production - load per bus. The PTDF is never
+formed; the reduced bus susceptance matrix B (without the slack bus) is factorized once
+with a sparse LU, and the PTDF rows of a set of lines are b_l (e_from - e_to) B^-1, one
+sparse solve for all of them. The flows of every hour are the same kind of solve with
+the injections as right-hand sides.
+
+The dispatch LP starts as the copperplate LP (one balance row per hour) and is solved
+with HiGHS. The flows of its solution are checked, and only the (line, hour) pairs that
+are over their limit get a row
+
+    -capacity <= PTDF[l] @ (production - load + unserved) <= capacity
+
+before HiGHS solves again from the previous basis. Congestion is usually limited to a
+few lines in a few hours, so a 1000-bus, 8760-hour study needs a small fraction of the
+len(lines) * 8760 limit rows.
+
+Losses (losses=True) are the R * flow^2 / U^2 of problem2.py, drawn half at each end of
+the line, with a loss variable per line and hour that is kept above a piecewise-linear
+outer approximation of the parabola. Instead of a fixed number of segments, the
+approximation is refined where the solution lands: a line and hour whose loss variable
+is more than loss_tol below the loss of its flow f* gets the tangent cut
+
+    loss >= R / U^2 * (2 f* flow - f*^2)
+
+so the problem stays an LP and every line only gets cuts near the flows it carries
+(the error drops by about a factor four per cut around the optimum). The cuts only
+bound the loss from below; a loss variable above the loss of its flow is power the LP
+burns on purpose (e.g. to move injections off a congested line), which no cut can
+remove, so it is measured and reported as well.
+
+    network = Network.from_conductors(["north", "south", "city"], LINES, voltage=0.132)
+    result = solve_network_dispatch(network, load, costs_variable, max_limits, unit_buses)
+    result.dispatch, result.flows, result.prices
+"""
+import warnings
+
+import highspy
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from dispatch_lp import build_dispatch_lp
+from line_economics import CONDUCTORS, line_capacity, loss_power, resistance
+
+REACTANCE = 0.4  # [ohm/km] typical series reactance of an overhead line
+
+
+class Network:
+    """Buses and lines of a DC power flow network, one array entry per line"""
+
+    def __init__(self, buses, from_bus, to_bus, susceptance, capacity, names=None, slack=0, resistance=None,
+                 voltage=None):
+        self.buses = list(buses)
+        self.from_bus = np.asarray(from_bus, dtype=int)    # bus index of the sending end
+        self.to_bus = np.asarray(to_bus, dtype=int)        # bus index of the receiving end
+        self.susceptance = np.asarray(susceptance, dtype=float)  # [1/ohm] 1 / reactance
+        self.capacity = np.asarray(capacity, dtype=float)  # [MW] thermal limit
+        self.names = list(names) if names is not None else list(range(len(self.from_bus)))
+        self.slack = slack                                 # bus index of the angle reference
+        self.resistance = resistance                       # [ohm] per line, None when unknown
+        self.voltage = voltage                             # [MV] per line, None when unknown
+        self._lu = None
+
+    @classmethod
+    def from_conductors(cls, buses, lines, voltage, catalog=CONDUCTORS, reactance=REACTANCE, resistivity=18,
+                        slack=0):
+        """Network of lines {name: (from bus, to bus, length [km], conductor)} with the
+        conductors of catalog {name: (area, max current, investment)}. voltage [MV] is a
+        scalar or one value per line; the thermal limit is line_capacity(voltage, max
+        current) and the reactance reactance [ohm/km] times the length."""
+        buses = list(buses)
+        index = {bus: i for i, bus in enumerate(buses)}
+        names = list(lines)
+        from_bus = [index[lines[name][0]] for name in names]
+        to_bus = [index[lines[name][1]] for name in names]
+        length = np.array([lines[name][2] for name in names], dtype=float)
+        area, current = np.array([catalog[lines[name][3]][:2] for name in names], dtype=float).T
+        voltage = np.broadcast_to(np.asarray(voltage, dtype=float), (len(names),))
+        return cls(buses, from_bus, to_bus, 1 / (reactance * length), line_capacity(voltage, current), names, slack,
+                   resistance(length, area, resistivity), voltage)
+
+    @property
+    def n_buses(self):
+        return len(self.buses)
+
+    @property
+    def n_lines(self):
+        return len(self.from_bus)
+
+    @property
+    def loss_coefficient(self):
+        """[1/MW] losses of every line per MW^2 of flow, R / U^2 as in line_economics.loss_power"""
+        return loss_power(self.resistance, 1.0, self.voltage)
+
+    def injections(self, dispatch, unit_bus, demand, line_losses=None):
+        """Net injections [MW] (hours x buses) of the dispatch (hours x units) of units on
+        the buses unit_bus, minus the demand (hours x buses) and the losses (hours x lines)
+        drawn half at each end of the lines"""
+        injections = -np.array(demand, dtype=float)
+        np.add.at(injections.T, unit_bus, np.asarray(dispatch).T)
+        if line_losses is not None:
+            np.add.at(injections.T, self.from_bus, -0.5 * line_losses.T)
+            np.add.at(injections.T, self.to_bus, -0.5 * line_losses.T)
+        return injections
+
+    def incidence(self):
+        """Sparse lines x buses incidence matrix: +1 at the sending end, -1 at the receiving end"""
+        n = self.n_lines
+        return sp.csr_matrix((np.concatenate([np.ones(n), -np.ones(n)]),
+                              (np.tile(np.arange(n), 2), np.concatenate([self.from_bus, self.to_bus]))),
+                             shape=(n, self.n_buses))
+
+    def _others(self):
+        return np.delete(np.arange(self.n_buses), self.slack)
+
+    def factorize(self):
+        """Sparse LU of the bus susceptance matrix without the slack bus, computed once"""
+        if self._lu is None:
+            incidence = self.incidence()
+            B = (incidence.T @ sp.diags(self.susceptance) @ incidence).tocsc()
+            others = self._others()
+            try:
+                self._lu = splu(B[others][:, others].tocsc())
+            except RuntimeError:
+                raise ValueError("The network is not connected, every bus needs a path to the slack bus") from None
+        return self._lu
+
+    def ptdf_rows(self, lines):
+        """PTDF rows (len(lines) x buses) of line indices lines: the flow on each line per
+        MW injected at a bus and taken out at the slack bus"""
+        lines = np.asarray(lines, dtype=int)
+        others = self._others()
+        rhs = np.zeros((len(others) + 1, len(lines)))
+        np.add.at(rhs, (self.from_bus[lines], np.arange(len(lines))), self.susceptance[lines])
+        np.add.at(rhs, (self.to_bus[lines], np.arange(len(lines))), -self.susceptance[lines])
+        out = np.zeros((len(lines), self.n_buses))
+        if len(lines):
+            # B is symmetric, so the rows of b_l (e_from - e_to) B^-1 are solves with B
+            out[:, others] = self.factorize().solve(np.ascontiguousarray(rhs[others])).T
+        return out
+
+    def ptdf(self):
+        """Full lines x buses PTDF, only meant for small networks"""
+        return self.ptdf_rows(np.arange(self.n_lines))
+
+    def flows(self, injections):
+        """Line flows [MW] (hours x lines) of net injections [MW] (hours x buses, summing to
+        zero every hour)"""
+        injections = np.atleast_2d(np.asarray(injections, dtype=float))
+        angles = np.zeros_like(injections)
+        others = self._others()
+        angles[:, others] = self.factorize().solve(np.ascontiguousarray(injections[:, others].T)).T
+        return (self.incidence() @ angles.T).T * self.susceptance
+
+
+class NetworkResult:
+    """Solution of the network dispatch"""
+
+    def __init__(self, network, modes, objective, dispatch, unserved, flows, prices, limit_rows, iterations,
+                 overloads, losses=None, loss_cuts=(), loss_errors=(), loss_overestimates=(), converged=True):
+        self.network = network
+        self.modes = list(modes)
+        self.objective = objective    # [EUR] including fixed costs and unserved load
+        self.dispatch = dispatch      # [MW] hours x modes
+        self.unserved = unserved      # [MW] hours x buses
+        self.flows = flows            # [MW] hours x lines
+        self.prices = prices          # [EUR/MWh] locational marginal prices, hours x buses
+        self.limit_rows = limit_rows  # (line, hour) pairs that got a limit row
+        self.iterations = iterations
+        self.converged = converged    # False when the flows break the limits or the losses are off by loss_tol
+        self.overloads = overloads    # [MW] largest overload of every iteration
+        self.losses = losses          # [MW] hours x lines, None without losses
+        self.loss_cuts = list(loss_cuts)      # (line, hour) pairs of every tangent cut
+        self.loss_errors = list(loss_errors)  # [MW] largest loss error of every iteration
+        self.loss_overestimates = list(loss_overestimates)  # [MW] largest loss above R * flow^2 / U^2
+
+    @property
+    def congested(self):
+        """Boolean hours x lines mask of the lines at their limit"""
+        return np.abs(self.flows) >= self.network.capacity * (1 - 1e-6)
+
+
+def bus_loads(load_demand, buses, n_hours=None):
+    """hours x buses array of loads [MW] from a dict {bus: profile or scalar} or an array"""
+    if isinstance(load_demand, dict):
+        if n_hours is None:
+            n_hours = max(np.size(value) for value in load_demand.values())
+        out = np.zeros((n_hours, len(buses)))
+        for bus, value in load_demand.items():
+            out[:, buses.index(bus)] = value
+        return out
+    return np.asarray(load_demand, dtype=float).reshape(-1, len(buses))
+
+
+def solve_network_dispatch(network, load_demand, costs_variable, max_limits, unit_buses, modes=None,
+                           costs_fixed=None, co2_emissions=None, cost_co2=0, value_of_lost_load=1000, tol=1e-6,
+                           losses=False, loss_tol=1e-3, max_iterations=50, **options):
+    """Dispatch of the modes on a Network with line limits, as a NetworkResult.
+
+    load_demand is a dict {bus: hourly profile} or an hours x buses array; unit_buses
+    maps every mode to its bus. The other arguments are the ones of build_dispatch_lp.
+    Load at a bus can go unserved at value_of_lost_load [EUR/MWh]. Limit rows are added
+    for the (line, hour) pairs whose flow exceeds the capacity by more than tol
+    (relative) until none does; options are HiGHS options. If that takes more than
+    max_iterations solves, the last solution is returned with converged False and a
+    RuntimeWarning, since its flows still break the limits.
+
+    With losses (True for every line, or a list of line indices) the lines consume
+    R * flow^2 / U^2, half at each end, and the loss of every line and hour is kept
+    within loss_tol [MW] of that by tangent cuts added where the solution lands. A
+    loss more than loss_tol below (cuts left after max_iterations) or above (power the
+    LP chose to burn in the line) that also gives converged False and a warning.
+    """
+    if max_iterations < 1:
+        raise ValueError(f"max_iterations must be at least 1, got {max_iterations}")
+    if modes is None:
+        modes = list(costs_variable)
+    load = bus_loads(load_demand, network.buses)
+    n_hours, n_buses, n_modes = len(load), network.n_buses, len(modes)
+    lp = build_dispatch_lp(load.sum(axis=1), costs_variable, max_limits, modes, costs_fixed, co2_emissions,
+                           cost_co2)
+    unit_bus = np.array([network.buses.index(unit_buses[mode]) for mode in modes])
+    # Unserved load only at the buses that have load
+    load_buses = np.flatnonzero(load.max(axis=0) > 0)
+    loss_lines = _loss_lines(network, losses)
+    n_load, n_loss = len(load_buses), len(loss_lines)
+    n_dispatch = n_hours * n_modes
+    first_loss = n_dispatch + n_hours * n_load
+    coefficient = network.loss_coefficient[loss_lines] if n_loss else np.empty(0)
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    for name, value in options.items():
+        h.setOptionValue(name, value)
+    n = first_loss + n_hours * n_loss
+    h.addVars(n, np.zeros(n), np.concatenate([lp.upper, load[:, load_buses].ravel(),
+                                              np.full(n_hours * n_loss, highspy.kHighsInf)]))
+    h.changeColsCost(n, np.arange(n, dtype=np.int32),
+                     np.concatenate([lp.c, np.full(n_hours * n_load, float(value_of_lost_load)),
+                                     np.zeros(n_hours * n_loss)]))
+    balance = sp.hstack([lp.A_eq, sp.kron(sp.identity(n_hours), np.ones((1, n_load))),
+                         sp.kron(sp.identity(n_hours), -np.ones((1, n_loss)))], format="csr")
+    _add_rows(h, balance, lp.b_eq, lp.b_eq)
+
+    ptdf = {}
+    rows = _FlowRows(network, load, unit_bus, load_buses, loss_lines, n_dispatch, first_loss, n)
+    overloads, loss_errors, loss_overestimates = [], [], []
+    for iteration in range(1, max_iterations + 1):
+        h.run()
+        if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            raise RuntimeError(f"Network dispatch not solved: {h.modelStatusToString(h.getModelStatus())}")
+        x = np.array(h.getSolution().col_value)
+        dispatch = x[:n_dispatch].reshape(n_hours, n_modes)
+        unserved = np.zeros((n_hours, n_buses))
+        unserved[:, load_buses] = x[n_dispatch:first_loss].reshape(n_hours, n_load)
+        line_losses = np.zeros((n_hours, network.n_lines))
+        line_losses[:, loss_lines] = x[first_loss:].reshape(n_hours, n_loss)
+        flows = network.flows(network.injections(dispatch, unit_bus, load - unserved, line_losses))
+
+        excess = np.abs(flows) - network.capacity * (1 + tol)
+        overloads.append(max(float(excess.max(initial=0)), 0.0))
+        limit_hours, limit_lines = np.nonzero(excess > 0)
+        # Loss of the flow against the loss variable, which the cuts keep below the true loss
+        error = coefficient * flows[:, loss_lines] ** 2 - line_losses[:, loss_lines]
+        loss_errors.append(max(float(error.max(initial=0)), 0.0))
+        loss_overestimates.append(max(0.0, float(-error.min(initial=0))))
+        cut_hours, cut = np.nonzero(error > loss_tol)
+        # Rows added after the last solve would leave the objective and duals without a solution
+        if not len(limit_hours) and not len(cut_hours) or iteration == max_iterations:
+            break
+        if len(limit_hours):
+            rows.add_limits(h, ptdf, limit_lines, limit_hours)
+        if len(cut_hours):
+            rows.add_cuts(h, ptdf, cut, cut_hours, flows[cut_hours, loss_lines[cut]])
+
+    converged = overloads[-1] == 0 and loss_errors[-1] <= loss_tol and loss_overestimates[-1] <= loss_tol
+    if overloads[-1] > 0:
+        warnings.warn(f"Network dispatch stopped after {iteration} iterations with lines {overloads[-1]:.3g} MW "
+                      "over their limits", RuntimeWarning)
+    if loss_errors[-1] > loss_tol:
+        warnings.warn(f"Network dispatch stopped after {iteration} iterations with losses {loss_errors[-1]:.3g} MW "
+                      "below R * flow^2 / U^2", RuntimeWarning)
+    if loss_overestimates[-1] > loss_tol:
+        warnings.warn(f"Network dispatch burns up to {loss_overestimates[-1]:.3g} MW as losses above "
+                      "R * flow^2 / U^2", RuntimeWarning)
+
+    # The price at a bus is the hourly balance dual plus the row duals times the PTDF of the bus
+    row_dual = np.array(h.getSolution().row_dual)
+    prices = np.repeat(row_dual[:n_hours, None], n_buses, axis=1)
+    for k in np.flatnonzero(row_dual[n_hours:]):
+        prices[rows.hours[k]] += row_dual[n_hours + k] * rows.factors[k] * ptdf[rows.lines[k]]
+    return NetworkResult(network, modes, h.getInfo().objective_function_value + lp.constant, dispatch,
+                         unserved, flows, prices, rows.limits, iteration, overloads,
+                         line_losses if n_loss else None, rows.cuts, loss_errors, loss_overestimates, converged)
+
+
+def _loss_lines(network, losses):
+    if losses is False or losses is None:
+        return np.empty(0, dtype=int)
+    if network.resistance is None or network.voltage is None:
+        raise ValueError("Losses need the resistance and voltage of the lines, see Network.from_conductors")
+    if losses is True:
+        return np.arange(network.n_lines)
+    return np.asarray(losses, dtype=int)
+
+
+class _FlowRows:
+    """Limit rows and loss cuts of a network dispatch, added to a Highs object.
+
+    Every row is factor * PTDF[line] @ (injections of the hour) plus, for cuts, the loss
+    variable of the line and hour. Only the PTDF of the unit buses, the load buses
+    (unserved load) and the loss lines (losses drawn at both ends) enter the row.
+    """
+
+    def __init__(self, network, load, unit_bus, load_buses, loss_lines, n_dispatch, first_loss, n):
+        self.network = network
+        self.load = load
+        self.unit_bus = unit_bus
+        self.load_buses = load_buses
+        self.loss_lines = loss_lines
+        self.n_dispatch = n_dispatch
+        self.first_loss = first_loss
+        self.n = n
+        self.lines, self.hours, self.factors = [], [], []  # per row, in the order of the rows
+        self.limits, self.cuts = [], []                    # (line, hour) pairs
+
+    def _rows(self, ptdf, lines, hours, factors, cut=None):
+        # Sparse rows and the flow of the load of the hour on the line (PTDF[line] @ load)
+        network = self.network
+        new = np.setdiff1d(lines, list(ptdf))
+        for line, row in zip(new, network.ptdf_rows(new)):
+            ptdf[line] = row
+        k, n_modes, n_load, n_loss = len(hours), len(self.unit_bus), len(self.load_buses), len(self.loss_lines)
+        rows = np.array([ptdf[line] for line in np.unique(lines)])
+        index = np.searchsorted(np.unique(lines), lines)
+        # A loss drawn half at each end of a line moves the flow like a load at both ends
+        ends = 0.5 * (rows[:, network.from_bus[self.loss_lines]] + rows[:, network.to_bus[self.loss_lines]])
+        coefficients = factors[:, None] * np.hstack([rows[:, self.unit_bus], rows[:, self.load_buses], -ends])[index]
+        if cut is not None:
+            coefficients[np.arange(k), n_modes + n_load + cut] += 1
+        columns = np.hstack([hours[:, None] * n_modes + np.arange(n_modes),
+                             self.n_dispatch + hours[:, None] * n_load + np.arange(n_load),
+                             self.first_loss + hours[:, None] * n_loss + np.arange(n_loss)])
+        matrix = sp.csr_matrix((coefficients.ravel(), columns.ravel(), np.arange(k + 1) * coefficients.shape[1]),
+                               shape=(k, self.n))
+        matrix.eliminate_zeros()
+        flow_of_load = (rows[index][:, self.load_buses] * self.load[hours][:, self.load_buses]).sum(axis=1)
+        self.lines.extend(lines.tolist())
+        self.hours.extend(hours.tolist())
+        self.factors.extend(factors.tolist())
+        return matrix, flow_of_load
+
+    def add_limits(self, h, ptdf, lines, hours):
+        """-capacity <= flow of line in hour <= capacity"""
+        matrix, flow_of_load = self._rows(ptdf, lines, hours, np.ones(len(lines)))
+        capacity = self.network.capacity[lines]
+        _add_rows(h, matrix, flow_of_load - capacity, flow_of_load + capacity)
+        self.limits.extend(zip(lines.tolist(), hours.tolist()))
+
+    def add_cuts(self, h, ptdf, cut, hours, flows):
+        """loss >= k (2 f* flow - f*^2), the tangent of k flow^2 at the flow f* of the solution,
+        for the loss lines with index cut into loss_lines"""
+        lines = self.loss_lines[cut]
+        slope = 2 * self.network.loss_coefficient[lines] * flows
+        matrix, flow_of_load = self._rows(ptdf, lines, hours, -slope, cut)
+        # The flow is the row minus the flow of the load, which moves to the bound
+        lower = -slope * flow_of_load - self.network.loss_coefficient[lines] * flows ** 2
+        _add_rows(h, matrix, lower, np.full(len(cut), highspy.kHighsInf))
+        self.cuts.extend(zip(lines.tolist(), hours.tolist()))
+
+
+def _add_rows(h, matrix, lower, upper):
+    h.addRows(matrix.shape[0], np.asarray(lower, dtype=float), np.asarray(upper, dtype=float), matrix.nnz,
+              matrix.indptr.astype(np.int32), matrix.indices.astype(np.int32), matrix.data.astype(float))
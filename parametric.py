@@ -0,0 +1,101 @@
+"""Exact parametric analysis of the total cost versus the CO2 price
+
+The optimal cost of the dispatch LP as a function of a uniform CO2 price is concave and
+piecewise linear: each optimal dispatch x gives a line cost(x) + price * emissions(x),
+and the curve is the lower envelope of these lines. The breakpoints are the prices where
+the merit order switches. They are found exactly by intersecting the lines of the
+solutions at both ends of an interval and solving once more at the intersection
+(Eisner-Severance), which takes about two solves per segment.
+"""
+import numpy as np
+from scipy.optimize import linprog
+
+
+class CostSegment:
+    """Part of the cost curve with one optimal dispatch"""
+
+    def __init__(self, start, end, intercept, slope, dispatch, co2_emissions):
+        self.start = start                  # [EUR/ton CO2] first price of the segment
+        self.end = end                      # [EUR/ton CO2] last price of the segment
+        self.intercept = intercept          # [EUR] total cost at a CO2 price of 0
+        self.slope = slope                  # [tons] total CO2 emissions = d cost / d price
+        self.dispatch = dispatch            # [MW] hours x modes
+        self.co2_emissions = co2_emissions  # [tons] per hour
+
+    def cost(self, price):
+        """Total cost [EUR] at the given CO2 price"""
+        return self.intercept + self.slope * np.asarray(price)
+
+
+class CostCurve:
+    """Exact piecewise-linear total cost curve over a CO2 price range"""
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    @property
+    def breakpoints(self):
+        """CO2 prices [EUR/ton CO2] where the optimal dispatch changes"""
+        return np.array([segment.start for segment in self.segments[1:]])
+
+    def prices(self):
+        """Start and end prices of the curve, with all breakpoints in between"""
+        return np.array([self.segments[0].start] + [segment.end for segment in self.segments])
+
+    def cost(self, price):
+        """Total cost [EUR] at the given CO2 price(s)"""
+        price = np.asarray(price, dtype=float)
+        return np.min([segment.cost(price) for segment in self.segments], axis=0)
+
+
+def _solve(lp, c0, d, price):
+    res = linprog(c0 + price * d, A_ub=lp.A_ub, b_ub=lp.b_ub, A_eq=lp.A_eq, b_eq=lp.b_eq,
+                  bounds=lp.bounds, method="highs")
+    if res.status != 0:
+        raise RuntimeError(f"Dispatch LP not solved at CO2 price {price}: {res.message}")
+    # Line of this dispatch: total cost = intercept + price * slope
+    return price, float(c0 @ res.x) + lp.constant, float(d @ res.x), res.x
+
+
+def co2_cost_curve(lp, price_min, price_max, tol=1e-6):
+    """Follow the optimal dispatch as the CO2 price goes from price_min to price_max.
+
+    lp is a dispatch_lp.DispatchLP built with co2_emissions; the CO2 price it was built
+    with is replaced by a uniform price over all hours. Returns a CostCurve with one
+    CostSegment per optimal dispatch, so the breakpoints are exact fuel-switching prices.
+    """
+    if lp.co2 is None:
+        raise ValueError("The dispatch LP has no CO2 emission factors")
+    d = np.ascontiguousarray(lp.co2).ravel()
+    c0 = lp.c - np.ascontiguousarray(lp.cost_co2[:, None] * lp.co2).ravel()
+
+    # Each pending interval holds the solutions at its two ends
+    lines = [_solve(lp, c0, d, price_min), _solve(lp, c0, d, price_max)]
+    pending = [(lines[0], lines[1])]
+    found = []
+    while pending:
+        left, right = pending.pop()
+        _, a_intercept, a_slope, _ = left
+        _, b_intercept, b_slope, _ = right
+        if abs(a_slope - b_slope) <= tol * max(1.0, abs(a_slope)):
+            continue
+        price = (b_intercept - a_intercept) / (a_slope - b_slope)
+        middle = _solve(lp, c0, d, price)
+        if middle[1] + middle[2] * price >= a_intercept + a_slope * price - tol * max(1.0, abs(middle[1])):
+            # Nothing cheaper at the intersection: it is a breakpoint between the two lines
+            found.append((price, left, right))
+        else:
+            pending.append((left, middle))
+            pending.append((middle, right))
+
+    found.sort(key=lambda item: item[0])
+    starts = [price_min] + [price for price, _, _ in found]
+    ends = [price for price, _, _ in found] + [price_max]
+    solutions = [lines[0]] + [right for _, _, right in found]
+    n_hours, n_modes = lp.n_hours, len(lp.modes)
+    segments = []
+    for start, end, (_, intercept, slope, x) in zip(starts, ends, solutions):
+        dispatch = x.reshape(n_hours, n_modes)
+        segments.append(CostSegment(start, end, intercept, slope, dispatch, (dispatch * lp.co2).sum(axis=1)))
+    return CostCurve(segments)
+
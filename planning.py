@@ -0,0 +1,352 @@
+"""Command-line and library entry point for the planning scenarios
+
+Every task is a named scenario that can be run from the command line or called from
+Python, with overrides of its input data:
+
+    python planning.py list
+    python planning.py run problem2
+    python planning.py run task3 --set cost_co2=80 --plot task3.png
+    python planning.py run task6 --json
+    python planning.py run task6 --cache solution_cache
+    python planning.py run task6 --metrics metrics
+
+    import planning
+    result = planning.run("task3", cost_co2=80)
+
+Pyomo, pandas and matplotlib are only imported by the scenarios that need them, so
+the pure arithmetic of problem 2 starts in milliseconds. Imports and solver lookups
+are done once per process, so a scheduler calling run() many times only pays for
+building and solving the models. With a cache (solution_cache.SolutionCache), a
+scenario that was already solved with the same inputs, overrides, solver and code (the
+modules the scenario uses) is read from disk without building or solving the model.
+
+With --metrics PATH (or inside an instrumentation.Recorder run) the wall time of every
+phase (data, import, build, write, solve, load, extract, plot) is appended to
+PATH.jsonl and written to PATH.prom for a Prometheus scraper; --metrics-memory adds the
+peak memory of every phase, which slows the run down:
+
+    python planning.py run task9 --metrics metrics
+"""
+import argparse
+import contextlib
+import functools
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+
+from instrumentation import phase, tag
+
+
+def _problem2(solver=None, **overrides):
+    import line_economics
+
+    return line_economics.problem2(**overrides)
+
+
+def _conductors(solver=None, **overrides):
+    import numpy as np
+    import conductors
+
+    choice = conductors.cheapest_conductor(**overrides)
+    costs = conductors.catalog_costs(**overrides)
+    return {"conductor": choice.conductor, "cost": choice.cost,
+            "catalog": {name: cost.tolist() for name, cost in zip(choice.names, np.moveaxis(costs, -1, 0))}}
+
+
+def _monte_carlo(solver=None, **overrides):
+    import monte_carlo
+
+    result = monte_carlo.simulate(**overrides)
+    return {"probability_positive": result.probability_positive, "mean": result.mean, "std": result.std,
+            "quantiles": result.quantiles, "sobol_first": result.sobol_first, "sobol_total": result.sobol_total}
+
+
+@functools.lru_cache(maxsize=None)
+def _solver_name(model_type):
+    """The solver_select choice for a model type, looked up once per process"""
+    from solver_select import default_solver
+
+    return default_solver(model_type)
+
+
+def _imports(source):
+    """Top-level names of the modules imported anywhere in source, also inside functions"""
+    import ast
+
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+@functools.lru_cache(maxsize=None)
+def _code_version(function):
+    """sha256 of the code a scenario function depends on, computed once per process: its
+    source and that of the planning functions it calls, plus the project modules these
+    import, directly or through other project modules"""
+    import inspect
+    import textwrap
+
+    functions, modules = {}, set()
+    pending = [function, getattr(function, "runner", None)]
+    while pending:
+        f = pending.pop()
+        if f is None or f.__qualname__ in functions:
+            continue
+        source = textwrap.dedent(inspect.getsource(f))
+        functions[f.__qualname__] = source
+        modules |= _imports(source)
+        for name in f.__code__.co_names:
+            value = globals().get(name)
+            if inspect.isfunction(value):
+                if value.__module__ == __name__:
+                    pending.append(value)
+                else:
+                    modules.add(value.__module__.split(".")[0])
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    sources = {}
+    while modules:
+        name = modules.pop()
+        path = os.path.join(directory, name + ".py")
+        if name in sources or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            sources[name] = f.read()
+        modules |= _imports(sources[name]) - set(sources)
+
+    h = hashlib.sha256()
+    for name in sorted(functions):
+        h.update(name.encode() + b"\0" + functions[name].encode() + b"\0")
+    for name in sorted(sources):
+        h.update(name.encode() + b".py\0" + sources[name] + b"\0")
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _solver(name):
+    """Solver object, created once per process"""
+    import pyomo.environ as pyo
+
+    return pyo.SolverFactory(name)
+
+
+def _dispatch_result(model, **extra):
+    import pyomo.environ as pyo
+    import extract
+
+    with phase("extract"):
+        result = {"objective": float(pyo.value(model.objective)), "modes": list(model.modes),
+                  "dispatch": extract.dispatch_array(model)}
+        result.update(extra)
+    return result
+
+
+def _dispatch_task(data, solver=None, **overrides):
+    with phase("import"):
+        import extract
+        import merit_order
+        from models import build_dispatch_model
+
+    solver = solver or _solver_name(_dispatch_task.model_type)
+    tag(solver=solver)
+    with phase("build"):
+        model = build_dispatch_model(**dict(data, **overrides))
+    tag(hours=len(model.hours), modes=len(model.modes))
+    merit_order.solve(model, _solver(solver))
+    result = _dispatch_result(model)
+    if "co2_emissions" in data:
+        result["co2"] = (result["dispatch"] * extract.param_array(model, model.co2_emissions)).sum(axis=1)
+    return result
+
+
+_dispatch_task.model_type = "lp_dispatch"
+
+
+def _battery_task(data, solver=None, **overrides):
+    with phase("import"):
+        import extract
+        from storage import solve_battery
+
+    solver = solver or _solver_name(_battery_task.model_type)
+    data = dict(data, **overrides)
+    tag(solver=solver, hours=len(data["load_demand"]), modes=len(data["costs_variable"]))
+    storage = solve_battery(data.pop("load_demand"), data.pop("costs_variable"), data.pop("max_limits"),
+                            solver=solver, **data)
+    return _dispatch_result(storage.model, soc=extract.values(storage.model.SOC), binary=storage.binary)
+
+
+_battery_task.model_type = "storage_milp"
+
+
+def _sizing_task(data, solver=None, **overrides):
+    with phase("import"):
+        import extract
+        import instrumentation
+        from models import build_sizing_model
+
+    solver = solver or _solver_name(_sizing_task.model_type)
+    tag(solver=solver)
+    with phase("build"):
+        model = build_sizing_model(**dict(data, **overrides))
+    tag(hours=len(model.hours), modes=len(model.modes))
+    instrumentation.solve(_solver(solver), model)
+    return _dispatch_result(model, unit_counts=extract.values(model.production_unit_count))
+
+
+_sizing_task.model_type = "sizing"
+
+
+def _task(runner, name):
+    def run_task(solver=None, **overrides):
+        with phase("data"):
+            import task_data
+
+            data = getattr(task_data, name)
+        return runner(data, solver, **overrides)
+    run_task.data = name
+    run_task.runner = runner
+    run_task.model_type = runner.model_type
+    return run_task
+
+
+# Scenario name: (description, function returning a dict of results)
+SCENARIOS = {
+    "problem2": ("Line and battery economics of problem 2", _problem2),
+    "conductors": ("Cheapest conductor of the catalog for the problem 2 line", _conductors),
+    "monte_carlo": ("Monte Carlo analysis of the problem 2 battery payment", _monte_carlo),
+    "task1": ("Dispatch of coal, gas, nuclear and biomass", _task(_dispatch_task, "TASK1")),
+    "task2": ("Dispatch with a battery", _task(_battery_task, "TASK2")),
+    "task3": ("Dispatch with a CO2 cost", _task(_dispatch_task, "TASK3")),
+    "task4": ("Dispatch with a CO2 cost and a NOx cap", _task(_dispatch_task, "TASK4")),
+    "task5": ("Dispatch with updated variable costs", _task(_dispatch_task, "TASK5")),
+    "task6": ("Dispatch with wind and solar", _task(_dispatch_task, "TASK6")),
+    "task7": ("Dispatch with solar and two wind plants", _task(_dispatch_task, "TASK7")),
+    "task8": ("Dispatch with modified wind production at t=17", _task(_dispatch_task, "TASK8")),
+    "task9": ("Sizing of the wind power plants", _task(_sizing_task, "TASK9")),
+}
+
+
+def run(name, solver=None, cache=None, **overrides):
+    """Run scenario name with overrides of its input data and return its results as a dict.
+
+    Task scenarios return the objective [EUR], the modes and the dispatch [MW] as an
+    hours x modes array (plus soc, unit_counts or hourly co2 where they apply); solver
+    overrides the solver chosen by solver_select (problem2, conductors and monte_carlo have no solver).
+    cache is a solution_cache.SolutionCache or its directory; results are then looked up
+    by the hash of the scenario, its input data, the overrides, the solver (the one
+    solver_select picks when solver is None) and the code the scenario uses first.
+    """
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {name}, expected one of {list(SCENARIOS)}")
+    function = SCENARIOS[name][1]
+    if cache is None:
+        return function(solver, **overrides)
+
+    from solution_cache import SolutionCache, cache_key
+
+    if not isinstance(cache, SolutionCache):
+        cache = SolutionCache(cache)
+    data = None
+    if hasattr(function, "data"):
+        import task_data
+
+        data = getattr(task_data, function.data)
+    if solver is None and hasattr(function, "model_type"):
+        solver = _solver_name(function.model_type)
+    key = cache_key(name, data, overrides, solver, _code_version(function))
+    with phase("cache"):
+        result = cache.get(key)
+    if result is None:
+        result = function(solver, **overrides)
+        cache.put(key, result)
+    return result
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _jsonable(value):
+    """value with arrays as lists and inf or nan (e.g. infeasible conductors) as None"""
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _plot(result, path):
+    import pandas as pd
+    from render import MODE_COLORS, render
+
+    df = pd.DataFrame(result["dispatch"], columns=result["modes"])
+    render("production", path, df, soc=result.get("soc"), colors=[MODE_COLORS.get(mode) for mode in df.columns])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the scenarios")
+    run_parser = commands.add_parser("run", help="run a scenario")
+    run_parser.add_argument("scenario", choices=list(SCENARIOS))
+    run_parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                            help="override an input, the value is parsed as JSON (e.g. cost_co2=80)")
+    run_parser.add_argument("--solver", default=None)
+    run_parser.add_argument("--plot", default=None, metavar="PATH", help="save the production figure")
+    run_parser.add_argument("--json", action="store_true", help="print all results as JSON")
+    run_parser.add_argument("--cache", default=None, metavar="DIR", help="reuse results cached in DIR")
+    run_parser.add_argument("--metrics", default=None, metavar="PATH",
+                            help="append phase timings to PATH.jsonl and write PATH.prom")
+    run_parser.add_argument("--metrics-memory", action="store_true",
+                            help="also trace the peak memory of every phase (much slower)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, (description, _) in SCENARIOS.items():
+            print(f"{name:10} {description}")
+        return
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = _parse_value(value)
+    recorded = contextlib.nullcontext()
+    if args.metrics:
+        from instrumentation import Recorder
+
+        recorded = Recorder(args.metrics + ".jsonl", args.metrics + ".prom",
+                            memory=args.metrics_memory).run(args.scenario)
+    with recorded:
+        start = time.perf_counter()
+        result = run(args.scenario, args.solver, args.cache, **overrides)
+        elapsed = time.perf_counter() - start
+        if args.plot and "dispatch" in result:
+            with phase("plot"):
+                _plot(result, args.plot)
+
+    if args.json:
+        json.dump(_jsonable(result), sys.stdout, allow_nan=False)
+        print()
+    else:
+        for key, value in result.items():
+            if getattr(value, "ndim", 0) == 0:
+                print(f"{key}: {value}")
+        print(f"time: {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Headless figure rendering
+
+Figures are built as explicit matplotlib Figure objects (no pyplot state, no window)
+from result DataFrames and arrays, and saved with the Agg canvas, so scripts and batch
+runs never block on plt.show(). render_many renders many figures in a process pool.
+Every saved figure gets a .sha256 sidecar with the hash of its inputs, RENDER_VERSION
+and the matplotlib version; a figure whose inputs did not change is not drawn again.
+Bump RENDER_VERSION whenever the drawing code changes the look of a figure.
+
+    render("production", "problem3_task1.png", df, title="Optimal production")
+    render_many(sweep_figures(run_sweep(base, scenarios), "figures"))
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+# Part of every figure key, so figures drawn by older code are redrawn
+RENDER_VERSION = 1
+
+# Colors of the modes in the task figures
+MODE_COLORS = {"coal": "C0", "gas": "C1", "nuclear": "C2", "biomass": "C3", "battery": "C4",
+               "solar": "C6", "wind": "C8", "wind2": "C9"}
+
+
+def production_figure(df, title=None, order=None, colors=None, soc=None, xlabel="Time [h]",
+                      ylabel="Generation [MW]", rotation=90):
+    """Stacked bar chart of the production (hours as index, modes as columns).
+
+    order gives the stacking order of the modes, colors a color per mode (a dict or a
+    list in the order of the columns). soc adds the state of charge as a line.
+    """
+    if order is not None:
+        df = df[list(order)]
+    if isinstance(colors, dict):
+        colors = [colors[mode] for mode in df.columns]
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    # One collection of rectangles per mode instead of one Rectangle artist per bar
+    x = np.arange(len(df))
+    values = df.to_numpy(dtype=float)
+    top = np.cumsum(values, axis=1)
+    bottom = top - values
+    left, right = x - 0.25, x + 0.25
+    for j, mode in enumerate(df.columns):
+        corners = np.stack([np.column_stack([left, bottom[:, j]]), np.column_stack([left, top[:, j]]),
+                            np.column_stack([right, top[:, j]]), np.column_stack([right, bottom[:, j]])], axis=1)
+        color = f"C{j}" if colors is None or colors[j] is None else colors[j]
+        ax.add_collection(PolyCollection(corners, facecolors=color, edgecolors="none", label=str(mode)))
+    if soc is not None:
+        ax.plot(x, soc, color="magenta", label="SOC")
+    ax.set_xlim(-0.5, len(df) - 0.5)
+    upper = top.max(initial=0.0) if soc is None else max(top.max(initial=0.0), np.max(soc))
+    ax.set_ylim(min(0.0, bottom.min(initial=0.0)), 1.05 * upper or 1.0)
+
+    ax.set_xticks(x, [str(label) for label in df.index], rotation=rotation)
+    if title is not None:
+        ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    # A fixed location, "best" scans every bar for overlaps and is the slowest part of drawing
+    ax.legend(loc="upper left")
+    return fig
+
+
+def line_figure(series, title=None, xlabel=None, ylabel=None, grid=False, xticks=None):
+    """Line plot of series, a list of (x, y) or (x, y, style) with style the keyword
+    arguments of Axes.plot (label, marker, linestyle, ...)"""
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    for x, y, *style in series:
+        ax.plot(x, y, **(style[0] if style else {}))
+    if any(style and "label" in style[0] for _, _, *style in series):
+        ax.legend()
+    if title is not None:
+        ax.set_title(title)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    if xticks is not None:
+        ax.set_xticks(list(xticks))
+    ax.grid(grid)
+    return fig
+
+
+FIGURES = {
+    "production": production_figure,
+    "line": line_figure,
+}
+
+
+def _update_hash(h, obj):
+    if isinstance(obj, pd.DataFrame):
+        _update_hash(h, ("DataFrame", list(obj.columns), list(obj.index)))
+        _update_hash(h, obj.to_numpy(dtype=float))
+    elif isinstance(obj, pd.Series):
+        _update_hash(h, ("Series", obj.name, list(obj.index)))
+        _update_hash(h, obj.to_numpy(dtype=float))
+    elif isinstance(obj, np.ndarray):
+        h.update(f"ndarray{obj.dtype.str}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"dict")
+        for key in sorted(obj, key=repr):
+            _update_hash(h, key)
+            _update_hash(h, obj[key])
+    elif isinstance(obj, (list, tuple, range)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for item in obj:
+            _update_hash(h, item)
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+
+
+def figure_key(kind, args=(), kwargs=None):
+    """sha256 of the figure kind and its inputs, RENDER_VERSION and the matplotlib version"""
+    h = hashlib.sha256()
+    _update_hash(h, (RENDER_VERSION, matplotlib.__version__, kind, tuple(args), kwargs or {}))
+    return h.hexdigest()
+
+
+def is_cached(path, key):
+    """True when path exists and was rendered from inputs with hash key"""
+    try:
+        with open(path + ".sha256") as f:
+            return f.read().strip() == key and os.path.exists(path)
+    except OSError:
+        return False
+
+
+def _render_job(job):
+    kind, path, args, kwargs, key = job
+    fig = FIGURES[kind](*args, **kwargs)
+    fig.savefig(path)
+    with open(path + ".sha256", "w") as f:
+        f.write(key)
+    return path
+
+
+def render(kind, path, *args, cache=True, **kwargs):
+    """Build figure kind from args and kwargs and save it to path.
+
+    Returns True when the figure was drawn, False when path was up to date.
+    """
+    key = figure_key(kind, args, kwargs)
+    if cache and is_cached(path, key):
+        return False
+    _render_job((kind, path, args, kwargs, key))
+    return True
+
+
+def render_many(jobs, max_workers=None, chunksize=4, cache=True):
+    """Render (kind, path, args, kwargs) jobs, in a process pool unless max_workers=1.
+
+    Jobs whose figure is up to date are skipped before anything is sent to the pool.
+    Returns the paths that were drawn.
+    """
+    pending = []
+    for kind, path, args, kwargs in jobs:
+        key = figure_key(kind, args, kwargs)
+        if not (cache and is_cached(path, key)):
+            pending.append((kind, path, tuple(args), kwargs, key))
+    if not pending:
+        return []
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count(), len(pending))
+    if max_workers == 1:
+        return list(map(_render_job, pending))
+    with ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(_render_job, pending, chunksize=chunksize))
+
+
+def sweep_figures(df, directory, title="Scenario {scenario}", **kwargs):
+    """Production figure jobs for render_many, one per scenario of a sweep.run_sweep DataFrame.
+
+    Figures are saved as directory/scenario_<n>.png; title is formatted with the scenario
+    number and the scalar overrides of the scenario.
+    """
+    os.makedirs(directory, exist_ok=True)
+    extra = [column for column in df.columns
+             if column not in ("scenario", "hour", "mode", "power", "co2", "price", "objective")]
+    jobs = []
+    for scenario, group in df.groupby("scenario", sort=True):
+        production = group.pivot(index="hour", columns="mode", values="power")
+        production.columns = list(production.columns)
+        labels = dict(group.iloc[0][extra]) if extra else {}
+        jobs.append(("production", os.path.join(directory, f"scenario_{scenario}.png"), (production,),
+                     dict(kwargs, title=title.format(scenario=scenario, **labels),
+                          colors=kwargs.get("colors", [MODE_COLORS.get(m) for m in production.columns]))))
+    return jobs
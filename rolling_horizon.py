@@ -0,0 +1,108 @@
+"""Rolling-horizon solution of the battery model
+
+Instead of one MILP over the whole horizon, overlapping windows (e.g. 48 h) are solved
+one after the other and only the first hours of each window (e.g. 24 h) are kept. The
+state of charge at the end of the kept hours is the initial state of the next window,
+and the rest of the previous window is used as a warm start. The same window model is
+re-solved for every window, so memory stays flat and the solve time grows linearly
+with the horizon.
+"""
+import numpy as np
+import pyomo.environ as pyo
+
+from models import build_battery_model, indexed_values, make_fleet
+from solver_session import PersistentSession
+
+
+class RollingHorizonResult:
+    """Committed schedule over the whole horizon"""
+
+    def __init__(self, modes, objective, dispatch, soc, charge, discharge):
+        self.modes = list(modes)
+        self.objective = objective  # [EUR] total cost of the committed schedule
+        self.dispatch = dispatch    # [MW] hours x modes
+        self.soc = soc              # [MWh] state of charge at the end of every hour
+        self.charge = charge        # [MW] Ein
+        self.discharge = discharge  # [MW] Eout
+
+
+def _values(var):
+    return np.fromiter((v.value for v in var.values()), dtype=float)
+
+
+def _shift_start(model, commit):
+    """Use the uncommitted hours of the last solution as the start of the next window"""
+    n_hours = len(model.hours)
+    for name in ("power_production", "Ein", "Eout", "SOC", "charge_this_hour", "discharge_this_hour"):
+        var = model.component(name)
+        if var is None:
+            continue
+        values = _values(var)
+        width = len(values) // n_hours
+        shifted = np.concatenate([values[commit * width:], np.tile(values[-width:], commit)])
+        var.set_values(dict(zip(var.keys(), shifted.tolist())), skip_validation=True)
+
+
+def solve_rolling_horizon(load_demand, costs_variable, max_limits, modes=None, costs_fixed=None,
+                          window=48, commit=24, solver="appsi_highs", soc_initial=0, **battery):
+    """Solve the battery model over a long horizon in overlapping windows.
+
+    Takes the arguments of models.build_battery_model for the whole horizon, with hourly
+    limit profiles as arrays. Each window covers window hours, of which the first commit are
+    kept. Persistent APPSI solvers keep the window model loaded and get the previous
+    solution as a MIP start; other solvers are called with a warm start when they
+    support it. Returns a RollingHorizonResult.
+    """
+    if not 0 < commit <= window:
+        raise ValueError("commit must be between 1 and window hours")
+    load = np.asarray(load_demand, dtype=float)
+    fleet = make_fleet(None, len(load), costs_variable, max_limits, modes, costs_fixed)
+    modes = fleet.modes
+    n_hours, n_modes = len(load), len(modes)
+
+    dispatch = np.empty((n_hours, n_modes))
+    soc = np.empty(n_hours)
+    charge = np.empty(n_hours)
+    discharge = np.empty(n_hours)
+
+    # One model (and solver session) per window length: the full window and the last, shorter one
+    windows = {}
+    for start in range(0, n_hours, commit):
+        stop = min(start + window, n_hours)
+        length = stop - start
+        keep = min(commit, length)
+        if length not in windows:
+            model = build_battery_model(load[start:stop], fleet=fleet.window(start, stop), soc_initial=soc_initial,
+                                        **battery)
+            if solver.startswith("appsi_"):
+                opt = PersistentSession(model, solver)
+            else:
+                opt = pyo.SolverFactory(solver)
+            windows[length] = model, opt
+            warmstart = False
+        else:
+            model, opt = windows[length]
+            hours = range(length)
+            model.load_demand.store_values(dict(zip(hours, load[start:stop].tolist())))
+            if fleet.profiles is not None:
+                model.max_profiles.store_values(indexed_values(fleet.profiles[start:stop], hours, fleet.profile_modes))
+            if "costs_variable" in fleet.hourly:
+                model.costs_variable.store_values(indexed_values(fleet.hourly["costs_variable"][start:stop], hours,
+                                                                 modes))
+            model.soc_initial = soc_initial
+            _shift_start(model, commit)
+            warmstart = True
+
+        if isinstance(opt, PersistentSession):
+            opt.solve(warmstart=warmstart)
+        else:
+            opt.solve(model, load_solutions=True, warmstart=warmstart and opt.warm_start_capable())
+
+        dispatch[start:start + keep] = _values(model.power_production).reshape(length, n_modes)[:keep]
+        soc[start:start + keep] = _values(model.SOC)[:keep]
+        charge[start:start + keep] = _values(model.Ein)[:keep]
+        discharge[start:start + keep] = _values(model.Eout)[:keep]
+        soc_initial = max(float(soc[start + keep - 1]), 0.0)
+
+    objective = float(n_hours * fleet.costs_fixed.sum() + (dispatch * fleet.values("costs_variable", n_hours)).sum())
+    return RollingHorizonResult(modes, objective, dispatch, soc, charge, discharge)
@@ -0,0 +1,45 @@
+"""Exact MILP reformulation of the unit sizing model of task 9
+
+Task 9 multiplies the continuous power_production[hour, mode] by the integer
+production_unit_count[mode], which makes the model nonconvex and ties it to Gurobi.
+Since every unit count is at least one, the total output of a mode
+power_output = power_production * production_unit_count is an exact change of
+variables: the products disappear and the limits become
+power_output <= max_limits * production_unit_count. The result is a small MILP that
+HiGHS, CBC or GLPK solve directly.
+"""
+import pyomo.environ as pyo
+
+from extract import limits_array, param_array
+from models import build_sizing_model
+
+
+def linearize(model):
+    """Return the exact MILP (models.build_sizing_model) of a bilinear task 9 sizing model"""
+    hours, modes = list(model.hours), list(model.modes)
+    cost_co2 = 0
+    co2_emissions = None
+    if model.component("co2_emissions") is not None:
+        co2_emissions = param_array(model, model.co2_emissions)
+        cost_co2 = param_array(model, model.cost_co2)[:, 0]
+    return build_sizing_model(
+        [pyo.value(model.load_demand[hour]) for hour in hours],
+        param_array(model, model.costs_variable),
+        limits_array(model),
+        {mode: pyo.value(model.max_unit_counts[mode]) for mode in modes},
+        modes=modes,
+        costs_fixed=param_array(model, model.costs_fixed),
+        co2_emissions=co2_emissions,
+        cost_co2=cost_co2,
+        linearized=True,
+        hour_weights=(None if model.component("hour_weights") is None
+                      else [pyo.value(weight) for weight in model.hour_weights.values()]))
+
+
+def load_solution(model, milp):
+    """Copy the solution of the MILP back into the unit counts and per-unit production of model"""
+    for mode in model.modes:
+        model.production_unit_count[mode].set_value(round(pyo.value(milp.production_unit_count[mode])))
+    for (hour, mode), var in model.power_production.items():
+        count = model.production_unit_count[mode].value
+        var.set_value(pyo.value(milp.power_output[hour, mode]) / count, skip_validation=True)
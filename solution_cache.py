@@ -0,0 +1,210 @@
+"""Content-addressed on-disk cache of solved scenarios
+
+A result is stored under the sha256 of a canonical encoding of everything that defines
+it (scenario name, input data, overrides, solver), so the same inputs always map to the
+same file whatever the order of dict keys or whether numbers are given as int, float,
+list or array. CACHE_VERSION is part of every key, so files of an older key encoding or
+file layout are never read; callers add a version of their own code to the parts.
+Results are dicts of arrays, numbers, strings and lists (nested dicts, also with
+number keys such as quantiles, are flattened with "/"), saved as one compressed .npz
+file per key without pickling. Lists, 0-d arrays and number keys are recorded and
+restored, so a cached result has the same types as a fresh one.
+The cache directory is bounded to max_bytes by evicting the least recently used files
+(the access time is the file modification time, updated on every hit).
+
+    cache = SolutionCache("solution_cache")
+    key = cache_key("task3", TASK3, {"cost_co2": 80}, "appsi_highs")
+    result = cache.get(key)
+    if result is None:
+        result = solve(...)
+        cache.put(key, result)
+"""
+import hashlib
+import numbers
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+SEPARATOR = "/"
+# Array of (name, kind) rows: the lists, the 0-d arrays and the dicts with int or float keys
+TYPES = "__types__"
+# Bump when the key encoding or the layout of the .npz files changes
+CACHE_VERSION = 2
+
+
+def _update_hash(h, obj):
+    if isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj, key=str):
+            _update_hash(h, str(key))
+            _update_hash(h, obj[key])
+        h.update(b"}")
+    elif isinstance(obj, str):
+        h.update(f"s{len(obj)}:".encode() + obj.encode())
+    elif obj is None or isinstance(obj, (bool, np.bool_)):
+        h.update(f"{obj!r};".encode())
+    elif isinstance(obj, numbers.Number):
+        # 30, 30.0 and np.float64(30) are the same input
+        h.update(f"n{float(obj)!r};".encode())
+    elif isinstance(obj, (list, tuple, range, np.ndarray)):
+        array = np.asarray(obj)
+        if array.dtype.kind in "biuf":
+            array = np.ascontiguousarray(array, dtype=float)
+            h.update(f"a{array.shape}".encode())
+            h.update(array.tobytes())
+        else:
+            h.update(f"l{len(obj)}[".encode())
+            for item in obj:
+                _update_hash(h, item)
+            h.update(b"]")
+    else:
+        raise TypeError(f"Cannot hash {type(obj).__name__} for the solution cache")
+
+
+def cache_key(*parts):
+    """sha256 (hex) of a canonical encoding of parts: dicts, lists, arrays, numbers, strings"""
+    h = hashlib.sha256()
+    _update_hash(h, CACHE_VERSION)
+    _update_hash(h, parts)
+    return h.hexdigest()
+
+
+def _key_kind(name, d):
+    if all(isinstance(k, str) for k in d):
+        return None
+    if all(isinstance(k, numbers.Integral) and not isinstance(k, (bool, np.bool_)) for k in d):
+        return "int"
+    if all(isinstance(k, numbers.Real) and not isinstance(k, (bool, np.bool_)) for k in d):
+        return "float"
+    raise TypeError(f"{name or 'result'} has keys that are not strings or numbers")
+
+
+def _flatten(result, prefix="", types=None):
+    arrays = {}
+    kind = _key_kind(prefix.rstrip(SEPARATOR), result)
+    if kind is not None:
+        types.append((prefix.rstrip(SEPARATOR), kind))
+    for key, value in result.items():
+        name = prefix + str(key)
+        if name == TYPES:
+            raise TypeError(f"{TYPES} is reserved")
+        if isinstance(value, dict):
+            arrays.update(_flatten(value, name + SEPARATOR, types))
+            continue
+        if isinstance(value, (list, tuple)):
+            types.append((name, "list"))
+        elif isinstance(value, np.ndarray) and value.ndim == 0:
+            types.append((name, "array"))
+        array = np.asarray(value)
+        if array.dtype.kind not in "biufU":
+            raise TypeError(f"{name} is not numeric or text")
+        arrays[name] = array
+    return arrays
+
+
+def _node(result, name):
+    node = result
+    for parent in name.split(SEPARATOR) if name else ():
+        node = node[parent]
+    return node
+
+
+def _unflatten(arrays):
+    types = arrays.pop(TYPES, np.empty((0, 2), dtype=str))
+    result = {}
+    for name, array in arrays.items():
+        *parents, key = name.split(SEPARATOR)
+        node = result
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = array.item() if array.ndim == 0 else array
+    for name, kind in types.tolist():
+        if kind in ("list", "array"):
+            *parents, key = name.split(SEPARATOR)
+            node = _node(result, SEPARATOR.join(parents))
+            node[key] = node[key].tolist() if kind == "list" else np.asarray(node[key])
+    # Deepest dicts first, so the names of their parents are still strings
+    for name, kind in sorted(types.tolist(), key=lambda row: -row[0].count(SEPARATOR)):
+        if kind in ("int", "float"):
+            node = _node(result, name)
+            items = [(int(key) if kind == "int" else float(key), value) for key, value in node.items()]
+            node.clear()
+            node.update(items)
+    return result
+
+
+class SolutionCache:
+    """Results on disk in directory, one .npz per key, at most max_bytes in total"""
+
+    def __init__(self, directory="solution_cache", max_bytes=256 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        """The cached result of key as a dict, or None. Scalars come back as Python
+        numbers, arrays (including string arrays such as modes) as arrays."""
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return _unflatten(arrays)
+
+    def put(self, key, result):
+        """Store result (a dict) under key and evict the least recently used results.
+        Warns and returns False without storing when result holds values that cannot be saved."""
+        types = []
+        try:
+            arrays = _flatten(result, types=types)
+        except TypeError as e:
+            warnings.warn(f"Result not cached: {e}", RuntimeWarning)
+            return False
+        if types:
+            arrays[TYPES] = np.array(types, dtype=str)
+        # Write to a temporary file first so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+        return True
+
+    def evict(self):
+        """Delete the least recently used results until the cache fits in max_bytes"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".npz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Delete every cached result"""
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".npz"):
+                    os.unlink(entry.path)
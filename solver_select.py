@@ -0,0 +1,175 @@
+"""Solver selection per model type
+
+Detects which solvers are installed, runs the same model through each of them under a
+time limit and records the build, write, solve and load times and whether the objective
+agrees with the other solvers. The fastest solver with a correct objective is stored
+per model type in solver_choices.json and returned by default_solver afterwards.
+
+Run "python solver_select.py" to time the task models and update the choices.
+"""
+import json
+import math
+import os
+import time
+
+import pyomo.environ as pyo
+
+import instrumentation
+
+CHOICES_FILE = os.environ.get("SOLVER_CHOICES", "solver_choices.json")
+
+# Candidates per model type, in the order used when nothing has been timed yet. HiGHS
+# comes with the highspy package and is the fastest of the free solvers on every type.
+CANDIDATES = {
+    "lp_dispatch": ["appsi_highs", "glpk", "cbc", "gurobi", "cplex"],
+    "storage_milp": ["appsi_highs", "glpk", "cbc", "gurobi", "cplex"],
+    "sizing": ["appsi_highs", "glpk", "cbc", "gurobi", "cplex"],
+    "unit_commitment": ["appsi_highs", "cbc", "glpk", "gurobi", "cplex"],
+}
+
+TIME_LIMIT_OPTIONS = {
+    "glpk": "tmlim",
+    "cbc": "sec",
+    "appsi_highs": "time_limit",
+    "gurobi": "TimeLimit",
+    "cplex": "timelimit",
+}
+
+
+def _available(name):
+    try:
+        return bool(pyo.SolverFactory(name).available(exception_flag=False))
+    except Exception:
+        return False
+
+
+def available_solvers(candidates):
+    """The candidates that are installed and licensed"""
+    return [name for name in candidates if _available(name)]
+
+
+def time_solver(build, solver, time_limit=60, extract=None):
+    """Build a model with build() and solve it with solver, timing each phase.
+
+    Returns a dict with the build, write, solve and load times [s], the termination
+    condition and the objective. The phases are the ones of instrumentation.solve: for
+    file-based solvers write is writing the problem file, solve the solver process and
+    load reading and loading its solution; for persistent solvers write is loading the
+    model into the solver. When extract is given, extract(model) is timed as well after
+    loading the solution.
+    """
+    record = {"solver": solver}
+    start = time.perf_counter()
+    model = build()
+    record["build"] = time.perf_counter() - start
+
+    opt = pyo.SolverFactory(solver)
+    option = TIME_LIMIT_OPTIONS.get(solver)
+    if option is not None:
+        opt.options[option] = time_limit
+
+    # A run of its own, that only keeps the phase records in memory
+    with instrumentation.Recorder(None, None).run("time_solver") as run:
+        results = instrumentation.solve(opt, model, load_solutions=False)
+        with instrumentation.phase("load"):
+            if results.solver.termination_condition == pyo.TerminationCondition.optimal:
+                if hasattr(opt, "load_vars"):
+                    opt.load_vars()
+                else:
+                    model.solutions.load_from(results)
+    seconds = {}
+    for entry in run.records:
+        seconds[entry["phase"]] = seconds.get(entry["phase"], 0.0) + entry["seconds"]
+    record["write"] = seconds.get("write", 0.0)
+    record["solve"] = seconds["solve"]
+    record["load"] = seconds.get("read", 0.0) + seconds["load"]
+
+    condition = results.solver.termination_condition
+    record["termination"] = str(condition)
+    record["objective"] = pyo.value(model.objective) if condition == pyo.TerminationCondition.optimal else math.nan
+    if extract is not None and condition == pyo.TerminationCondition.optimal:
+        start = time.perf_counter()
+        extract(model)
+        record["extract"] = time.perf_counter() - start
+    return record
+
+
+def compare_solvers(model_type, build, solvers=None, time_limit=60, rtol=1e-6):
+    """Time every installed solver on one model and mark which objectives agree.
+
+    The reference objective is the best one found; a solver is correct when it reached
+    optimality within rtol of it. Returns the list of records of time_solver with an
+    added "correct" flag and "total" time (write + solve + load).
+    """
+    if solvers is None:
+        solvers = available_solvers(CANDIDATES[model_type])
+    records = []
+    for solver in solvers:
+        try:
+            record = time_solver(build, solver, time_limit)
+        except Exception as e:
+            record = {"solver": solver, "termination": f"error: {e}", "objective": math.nan}
+        record["model_type"] = model_type
+        records.append(record)
+
+    objectives = [r["objective"] for r in records if not math.isnan(r["objective"])]
+    reference = min(objectives) if objectives else math.nan
+    for record in records:
+        record["correct"] = bool(objectives) and not math.isnan(record["objective"]) \
+            and abs(record["objective"] - reference) <= rtol * max(1.0, abs(reference))
+        record["total"] = sum(record.get(phase, math.nan) for phase in ("write", "solve", "load"))
+    return records
+
+
+def load_choices(path=CHOICES_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def select_solver(model_type, build, solvers=None, time_limit=60, path=CHOICES_FILE):
+    """Time the solvers on a model and remember the fastest correct one for model_type"""
+    records = compare_solvers(model_type, build, solvers, time_limit)
+    correct = [r for r in records if r["correct"]]
+    if correct:
+        best = min(correct, key=lambda r: r["total"])
+        choices = load_choices(path)
+        choices[model_type] = best["solver"]
+        with open(path, "w") as f:
+            json.dump(choices, f, indent=2)
+    return records
+
+
+def default_solver(model_type, path=CHOICES_FILE):
+    """The remembered solver for model_type if it is still installed, else the first installed
+    candidate. Candidates are probed in order until one is found, so call it where the
+    model is solved rather than at import time."""
+    candidates = CANDIDATES[model_type]
+    chosen = load_choices(path).get(model_type)
+    for name in ([chosen] if chosen is not None else []) + candidates:
+        if _available(name):
+            return name
+    raise RuntimeError(f"None of the solvers {candidates} is available for {model_type}")
+
+
+def task_builds():
+    """Builders of the task models for every model type"""
+    from models import build_battery_model, build_dispatch_model, build_sizing_model
+    from task_data import TASK2, TASK4, TASK9
+
+    return {
+        "lp_dispatch": lambda: build_dispatch_model(**TASK4),
+        "storage_milp": lambda: build_battery_model(**TASK2),
+        "sizing": lambda: build_sizing_model(**TASK9),
+    }
+
+
+if __name__ == "__main__":
+    for model_type, build in task_builds().items():
+        for record in select_solver(model_type, build):
+            print(f"{model_type:13} {record['solver']:12} correct={record['correct']!s:5} "
+                  f"build={record.get('build', math.nan):.3f}s write={record.get('write', math.nan):.3f}s "
+                  f"solve={record.get('solve', math.nan):.3f}s load={record.get('load', math.nan):.3f}s "
+                  f"objective={record['objective']}")
+    print("Choices:", load_choices())
@@ -0,0 +1,59 @@
+"""Persistent solver session for parameter sweeps
+
+Keeps a model loaded in a persistent (APPSI) solver between solves. Changing mutable
+parameters only pushes the affected objective coefficients, variable bounds and
+right-hand sides to the solver, which then re-solves from the previous basis instead of
+rewriting an LP file and starting a new solver process.
+"""
+import pyomo.environ as pyo
+
+
+class PersistentSession:
+    """Re-solve one model after changes to its mutable parameters.
+
+    Example, for the CO2 sweep of problem3_task3.py (model.cost_co2 is mutable):
+
+        session = PersistentSession(model)
+        for co2_cost in co2_costs_range:
+            session.solve(cost_co2=co2_cost)
+            total_costs.append(pyo.value(model.objective))
+    """
+
+    def __init__(self, model, solver="appsi_highs", **options):
+        self.model = model
+        self.opt = pyo.SolverFactory(solver)
+        if not hasattr(self.opt, "update_config"):
+            raise ValueError(f"{solver} is not a persistent APPSI solver, use e.g. appsi_highs or appsi_gurobi")
+        for key, value in options.items():
+            self.opt.options[key] = value
+
+        # The structure of the model is fixed during a sweep, so only look for
+        # changed parameter values when re-solving
+        config = self.opt.update_config
+        config.check_for_new_or_removed_constraints = False
+        config.check_for_new_or_removed_vars = False
+        config.check_for_new_or_removed_params = False
+        config.check_for_new_objective = False
+        config.update_constraints = False
+        config.update_named_expressions = False
+        config.update_objective = False
+        config.update_params = True
+        config.update_vars = True
+        self.opt.set_instance(model)
+
+    def update(self, **params):
+        """Set mutable parameters by name, to a scalar for all indices or a dict of values"""
+        for name, values in params.items():
+            param = self.model.component(name)
+            if param is None or not param.mutable:
+                raise ValueError(f"{name} is not a mutable parameter of the model")
+            param.store_values(values)
+
+    def solve(self, warmstart=False, **params):
+        """Update the given parameters, re-solve and load the solution into the model.
+
+        With warmstart=True the current variable values are passed to the solver as a
+        starting point (a MIP start for models with integer variables).
+        """
+        self.update(**params)
+        return self.opt.solve(self.model, load_solutions=True, warmstart=warmstart)
@@ -0,0 +1,279 @@
+"""Two-stage stochastic dispatch with uncertain wind and solar production
+
+Tasks 6-8 treat the wind and solar limits as known. Here they are a set of scenarios:
+
+    first stage   the schedule x[hour, mode] of the firm modes (coal, gas: every mode
+                  without an hourly profile) is committed before the weather is known,
+                  at the variable cost of the modes
+    second stage  in every scenario the renewables produce up to their scenario profile
+                  and the balance is restored with recourse: firm modes run above their
+                  schedule at up_cost_factor times their variable cost, run below it
+                  and get down_cost_factor of the variable cost back, and unserved load
+                  costs value_of_lost_load
+
+The problem is solved with the L-shaped method (Benders decomposition): a master LP over
+the schedule and one recourse cost estimate per hour, and optimality cuts from the
+hourly prices of the recourse problems. Recourse is always feasible (load can be shed
+and firm modes turned down), so no feasibility cuts are needed. Like the deterministic
+dispatch, the recourse has no links between hours and is solved by merit order. The
+scenarios are solved in batches spread over worker processes; every worker gets the
+scenario data once and returns only the expected cost and its gradient per hour, so
+the master stays small (hours x firm modes + hours columns) whatever the number of
+scenarios.
+"""
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+from dispatch_lp import hour_array
+from merit_order import merit_order_dispatch
+from models import make_fleet
+
+
+class StochasticResult:
+    """Schedule of the firm modes and its expected cost"""
+
+    def __init__(self, modes, firm_modes, objective, lower_bound, schedule, scenario_costs, iterations, gaps,
+                 converged=True):
+        self.modes = list(modes)
+        self.firm_modes = list(firm_modes)
+        self.objective = objective            # [EUR] expected cost including fixed costs
+        self.lower_bound = lower_bound        # [EUR] master objective of the last iteration
+        self.schedule = schedule              # [MW] hours x firm_modes, committed in the first stage
+        self.scenario_costs = scenario_costs  # [EUR] total cost of the schedule in every scenario
+        self.iterations = iterations
+        self.gaps = gaps                      # relative gap of every iteration
+        self.converged = converged            # False when max_iterations ran out before the gap closed
+
+
+def sample_scenarios(profiles, n_scenarios, sigma=0.25, rho=0.8, seed=None):
+    """n_scenarios x hours x modes scenarios of hours x modes forecast profiles.
+
+    The forecast is multiplied by lognormal errors with standard deviation sigma of the
+    log and an AR(1) correlation rho from one hour to the next.
+    """
+    profiles = np.asarray(profiles, dtype=float)
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((n_scenarios,) + profiles.shape)
+    errors = np.empty_like(noise)
+    errors[:, 0] = noise[:, 0]
+    for hour in range(1, profiles.shape[0]):
+        errors[:, hour] = rho * errors[:, hour - 1] + np.sqrt(1 - rho ** 2) * noise[:, hour]
+    return profiles * np.exp(sigma * errors - sigma ** 2 / 2)
+
+
+class Recourse:
+    """Second-stage data: load, firm and renewable modes and the scenario profiles.
+
+    The recourse of one hour is a merit-order dispatch: with the firm modes split into
+    their scheduled output (worth down_cost_factor times the variable cost, the part
+    that is not paid back when turned down) and their headroom above the schedule (at
+    up_cost_factor times the variable cost), the balance is the cheapest mix of those,
+    the renewables and unserved load. Every hour of every scenario is solved at once by
+    merit_order.merit_order_dispatch.
+    """
+
+    def __init__(self, load, firm_costs, firm_limits, renewable_costs, scenarios, probabilities,
+                 up_cost_factor, down_cost_factor, value_of_lost_load):
+        self.load = load                    # [MW] hours
+        self.firm_costs = firm_costs        # [EUR/MWh] firm modes
+        self.firm_limits = firm_limits      # [MW] firm modes
+        self.scenarios = scenarios          # [MW] scenarios x hours x profiled modes
+        self.probabilities = probabilities  # scenarios
+        self.down_costs = down_cost_factor * firm_costs
+        self.up_costs = up_cost_factor * firm_costs
+        # Merit-order options: scheduled firm, firm above schedule, renewables, unserved load
+        self.costs = np.concatenate([self.down_costs, self.up_costs, renewable_costs, [value_of_lost_load]])
+
+    def solve(self, schedule, start, stop):
+        """Expected recourse cost per hour of scenarios start to stop (weighted by their
+        probabilities), its gradient with respect to the schedule and the cost per scenario"""
+        n_scenarios, (n_hours, n_firm) = stop - start, schedule.shape
+        limits = np.empty((n_scenarios, n_hours, len(self.costs)))
+        limits[..., :n_firm] = schedule
+        limits[..., n_firm:2 * n_firm] = self.firm_limits - schedule
+        limits[..., 2 * n_firm:-1] = self.scenarios[start:stop]
+        limits[..., -1] = self.load
+        limits = limits.reshape(n_scenarios * n_hours, -1)
+        result = merit_order_dispatch(np.tile(self.load, n_scenarios), self.costs, limits)
+
+        # Cost relative to paying the whole schedule: turning down returns all but down_costs
+        hourly = (result.dispatch @ self.costs).reshape(n_scenarios, n_hours) - schedule @ self.down_costs
+        # d cost / d schedule: one MW more scheduled and one MW less headroom, at the hourly price
+        price = result.marginal_price.reshape(n_scenarios, n_hours, 1)
+        gradient = (-self.down_costs - np.maximum(price - self.down_costs, 0)
+                    + np.maximum(price - self.up_costs, 0))
+        weights = self.probabilities[start:stop]
+        return weights @ hourly, np.einsum("s,shf->hf", weights, gradient), hourly.sum(axis=1)
+
+
+# Recourse data of the current worker process
+_worker = {}
+
+
+def _init_worker(recourse):
+    _worker["recourse"] = recourse
+
+
+def _solve_batch(job):
+    schedule, start, stop = job
+    return _worker["recourse"].solve(schedule, start, stop)
+
+
+def _batches(n_scenarios, n_batches):
+    edges = np.linspace(0, n_scenarios, min(n_batches, n_scenarios) + 1).round().astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _prepare(load_demand, costs_variable, max_limits, scenarios, probabilities, modes, costs_fixed):
+    load = np.asarray(load_demand, dtype=float)
+    fleet = make_fleet(None, len(load), costs_variable, max_limits, modes, costs_fixed)
+    if fleet.hourly:
+        raise ValueError("The recourse costs are per mode, costs_variable cannot vary by hour")
+    firm = ~fleet.profiled
+    if isinstance(scenarios, (list, tuple)) and scenarios and isinstance(scenarios[0], dict):
+        scenarios = [np.column_stack([hour_array(scenario[mode], len(load)) for mode in fleet.profile_modes])
+                     for scenario in scenarios]
+    scenarios = np.asarray(scenarios, dtype=float).reshape(len(scenarios), len(load), len(fleet.profile_modes))
+    if probabilities is None:
+        probabilities = np.full(len(scenarios), 1 / len(scenarios))
+    probabilities = np.asarray(probabilities, dtype=float)
+    if len(probabilities) != len(scenarios) or not np.isclose(probabilities.sum(), 1):
+        raise ValueError("probabilities must have one entry per scenario and sum to 1")
+    constant = len(load) * float(fleet.costs_fixed.sum())
+    return fleet, firm, load, scenarios, probabilities, constant
+
+
+def solve_stochastic(load_demand, costs_variable, max_limits, scenarios, probabilities=None, modes=None,
+                     costs_fixed=None, up_cost_factor=1.5, down_cost_factor=0.5, value_of_lost_load=1000,
+                     tol=1e-6, max_iterations=200, max_workers=None, batches_per_worker=4):
+    """Solve the two-stage dispatch by the L-shaped method and return a StochasticResult.
+
+    Takes the arguments of models.build_dispatch_model; the modes with an hourly limit
+    profile in max_limits are the uncertain renewables. scenarios holds their production
+    limits per scenario, as a scenarios x hours x profiled modes array (modes in the order
+    of max_limits, see sample_scenarios) or a list of dicts {mode: profile}; probabilities
+    default to equally likely scenarios. The recourse LPs of every iteration are solved
+    in batches in max_workers processes (in this process with max_workers=1). Stops when
+    the gap between the best expected cost and the master bound is below tol (relative);
+    if it is still above tol after max_iterations, the best schedule so far is returned
+    with converged False and a RuntimeWarning.
+    """
+    if max_iterations < 1:
+        raise ValueError(f"max_iterations must be at least 1, got {max_iterations}")
+    fleet, firm, load, scenarios, probabilities, constant = _prepare(
+        load_demand, costs_variable, max_limits, scenarios, probabilities, modes, costs_fixed)
+    firm_costs, firm_limits = fleet.costs_variable[firm], fleet.max_limits[firm]
+    recourse = Recourse(load, firm_costs, firm_limits, fleet.costs_variable[~firm], scenarios, probabilities,
+                        up_cost_factor, down_cost_factor, value_of_lost_load)
+    n_hours, n_firm = len(load), len(firm_costs)
+
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    batches = _batches(len(scenarios), max_workers * batches_per_worker if max_workers > 1 else 1)
+    executor = None
+    if max_workers > 1:
+        executor = ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(recourse,))
+    else:
+        _init_worker(recourse)
+
+    # Master: min firm_costs x + sum(theta) over x (hours x firm, flattened) and theta (hours).
+    # Turning every firm MW down earns at most down_cost_factor times its cost back.
+    c = np.concatenate([np.tile(firm_costs, n_hours), np.ones(n_hours)])
+    theta_min = -down_cost_factor * float(firm_costs @ firm_limits)
+    bounds = np.column_stack([np.concatenate([np.tile(np.zeros(n_firm), n_hours), np.full(n_hours, theta_min)]),
+                              np.concatenate([np.tile(firm_limits, n_hours), np.full(n_hours, np.inf)])])
+    hour_of_x = np.repeat(np.arange(n_hours), n_firm)
+    cut_rows, cut_rhs = [], []
+    best, best_schedule, best_costs = np.inf, None, None
+    lower_bound, gaps = -np.inf, []
+    schedule = np.zeros((n_hours, n_firm))
+    try:
+        for iteration in range(1, max_iterations + 1):
+            if executor is None:
+                parts = [_solve_batch((schedule, start, stop)) for start, stop in batches]
+            else:
+                parts = list(executor.map(_solve_batch, [(schedule, start, stop) for start, stop in batches]))
+            expected = sum(part[0] for part in parts)
+            gradient = sum(part[1] for part in parts)
+            upper = float(firm_costs @ schedule.sum(axis=0) + expected.sum())
+            if upper < best:
+                best, best_schedule = upper, schedule
+                best_costs = np.concatenate([part[2] for part in parts]) + float(schedule.sum(axis=0) @ firm_costs)
+
+            # One cut per hour: theta_h >= expected_h + gradient_h (x_h - schedule_h)
+            cuts = sp.hstack([sp.csr_matrix((gradient.ravel(), (hour_of_x, np.arange(n_hours * n_firm))),
+                                            shape=(n_hours, n_hours * n_firm)),
+                              -sp.identity(n_hours, format="csr")])
+            cut_rows.append(cuts)
+            cut_rhs.append((gradient * schedule).sum(axis=1) - expected)
+            res = linprog(c, A_ub=sp.vstack(cut_rows, format="csr"), b_ub=np.concatenate(cut_rhs), bounds=bounds,
+                          method="highs")
+            if res.status != 0:
+                raise RuntimeError(f"Master LP not solved: {res.message}")
+            lower_bound = res.fun
+            schedule = res.x[:n_hours * n_firm].reshape(n_hours, n_firm)
+            gaps.append((best - lower_bound) / max(1.0, abs(best)))
+            if gaps[-1] <= tol:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    converged = gaps[-1] <= tol
+    if not converged:
+        warnings.warn(f"L-shaped method stopped after {iteration} iterations with a gap of {gaps[-1]:.3g}",
+                      RuntimeWarning)
+    return StochasticResult(fleet.modes, np.asarray(fleet.modes)[firm].tolist(), best + constant,
+                            lower_bound + constant, best_schedule, best_costs + constant, iteration, gaps,
+                            converged)
+
+
+def solve_extensive(load_demand, costs_variable, max_limits, scenarios, probabilities=None, modes=None,
+                    costs_fixed=None, up_cost_factor=1.5, down_cost_factor=0.5, value_of_lost_load=1000):
+    """Solve the same two-stage problem as one LP over all scenarios (the extensive form).
+
+    Only meant for checking solve_stochastic on small cases: the LP grows with the number
+    of scenarios. Returns the expected cost [EUR] and the schedule [MW] hours x firm modes.
+    """
+    fleet, firm, load, scenarios, probabilities, constant = _prepare(
+        load_demand, costs_variable, max_limits, scenarios, probabilities, modes, costs_fixed)
+    firm_costs, firm_limits = fleet.costs_variable[firm], fleet.max_limits[firm]
+    recourse = Recourse(load, firm_costs, firm_limits, fleet.costs_variable[~firm], scenarios, probabilities,
+                        up_cost_factor, down_cost_factor, value_of_lost_load)
+    # Recourse columns of every scenario and hour: up[firm], down[firm], renewables, unserved load
+    costs = np.concatenate([recourse.up_costs, -recourse.down_costs, recourse.costs[2 * len(firm_costs):]])
+    n_scenarios, n_hours, n_firm, width = len(scenarios), len(load), len(firm_costs), len(costs)
+    rows = n_scenarios * n_hours
+
+    # Columns: schedule (hours x firm), then the recourse of every scenario and hour
+    c = np.concatenate([np.tile(firm_costs, n_hours), np.kron(probabilities, np.tile(costs, n_hours))])
+    to_rows = sp.kron(sp.csr_matrix(np.ones((n_scenarios, 1))), sp.kron(sp.identity(n_hours), np.ones(n_firm)))
+    row = np.concatenate([np.ones(n_firm), -np.ones(n_firm), np.ones(width - 2 * n_firm)])
+    A_eq = sp.hstack([to_rows, sp.kron(sp.identity(rows), row[None, :])], format="csr")
+    # up + x <= limit and down - x <= 0 for every scenario, hour and firm mode
+    columns = (np.arange(rows)[:, None] * width + np.arange(n_firm)).ravel()
+    x_columns = np.tile(np.arange(n_hours * n_firm), n_scenarios)
+    n_links = rows * n_firm
+    link_up = sp.hstack([sp.csr_matrix((np.ones(n_links), (np.arange(n_links), x_columns)),
+                                       shape=(n_links, n_hours * n_firm)),
+                         sp.csr_matrix((np.ones(n_links), (np.arange(n_links), columns)), shape=(n_links, rows * width))])
+    link_down = sp.hstack([sp.csr_matrix((-np.ones(n_links), (np.arange(n_links), x_columns)),
+                                         shape=(n_links, n_hours * n_firm)),
+                           sp.csr_matrix((np.ones(n_links), (np.arange(n_links), columns + n_firm)),
+                                         shape=(n_links, rows * width))])
+    upper = np.empty((n_scenarios, n_hours, width))
+    upper[..., :2 * n_firm] = np.inf
+    upper[..., 2 * n_firm:-1] = scenarios
+    upper[..., -1] = load
+    bounds = np.column_stack([np.zeros(len(c)), np.concatenate([np.tile(firm_limits, n_hours), upper.ravel()])])
+    res = linprog(c, A_ub=sp.vstack([link_up, link_down], format="csr"),
+                  b_ub=np.concatenate([np.tile(firm_limits, rows), np.zeros(n_links)]),
+                  A_eq=A_eq, b_eq=np.tile(load, n_scenarios), bounds=bounds, method="highs")
+    if res.status != 0:
+        raise RuntimeError(f"Extensive form not solved: {res.message}")
+    return res.fun + constant, res.x[:n_hours * n_firm].reshape(n_hours, n_firm)
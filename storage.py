@@ -0,0 +1,65 @@
+"""Binary-free storage formulation of the battery model
+
+Task 2 adds two binaries per hour only to stop the battery from charging and
+discharging in the same hour. With a round-trip efficiency below one (0.95 each way by
+default) doing both at once wastes energy, so the LP relaxation without the binaries
+already has the same optimum in practice. The lossless battery of task 2 only has its
+positive discharge cost against it, which is where the fallback below matters. The LP is solved first
+and the binary model is only solved when the LP solution actually charges and
+discharges in the same hour.
+"""
+import numpy as np
+import pyomo.environ as pyo
+
+import instrumentation
+from extract import values
+from instrumentation import phase
+from models import build_battery_model
+
+
+class StorageResult:
+    """Solved battery model, and whether the binary formulation was needed"""
+
+    def __init__(self, model, binary, simultaneous):
+        self.model = model                # solved model, LP or MILP
+        self.binary = binary              # True when the LP solution had to be replaced
+        self.simultaneous = simultaneous  # hours where the LP charged and discharged at once
+
+    @property
+    def objective(self):
+        return pyo.value(self.model.objective)
+
+
+def simultaneous_hours(model, tol=1e-6):
+    """Hours where the solution has both Ein and Eout above tol [MW]"""
+    return np.flatnonzero(np.minimum(values(model.Ein), values(model.Eout)) > tol)
+
+
+def solve_battery(load_demand, costs_variable, max_limits, solver=None, binary=None, tol=1e-6, **kwargs):
+    """Solve the battery model, as an LP unless complementarity is violated.
+
+    kwargs are passed on to models.build_battery_model. solver defaults to the
+    solver_select choice for storage_milp. binary=True forces the binary formulation,
+    binary=False returns the LP solution without the check. Returns a StorageResult.
+    """
+    if solver is None:
+        from solver_select import default_solver
+
+        solver = default_solver("storage_milp")
+    opt = pyo.SolverFactory(solver)
+    if binary:
+        with phase("build"):
+            model = build_battery_model(load_demand, costs_variable, max_limits, binary=True, **kwargs)
+        instrumentation.solve(opt, model)
+        return StorageResult(model, True, np.empty(0, dtype=int))
+
+    with phase("build"):
+        model = build_battery_model(load_demand, costs_variable, max_limits, binary=False, **kwargs)
+    instrumentation.solve(opt, model)
+    hours = simultaneous_hours(model, tol)
+    if binary is None and len(hours):
+        with phase("build"):
+            model = build_battery_model(load_demand, costs_variable, max_limits, binary=True, **kwargs)
+        instrumentation.solve(opt, model)
+        return StorageResult(model, True, hours)
+    return StorageResult(model, False, hours)
@@ -0,0 +1,150 @@
+"""Parallel scenario sweeps over the dispatch model
+
+Every worker process builds one dispatch model from the base case and re-solves it for
+each scenario it receives, only changing the mutable parameters the scenario overrides:
+load_demand, costs_variable, cost_co2, max_limits and the solver. The parameters are
+reset to the base case before every scenario, so a scenario only sees its own overrides.
+When a scenario gives hourly values (an hourly price, an outage profile) for a parameter
+the model keeps per mode, the worker rebuilds its model once with that parameter
+indexed by hour. Results are collected
+as arrays and returned as one tidy DataFrame with a row per scenario, hour and mode.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+
+import extract
+from models import accepts_mode_values, build_dispatch_model, set_hour_values, set_mode_values
+from solver_select import default_solver
+from solver_session import PersistentSession
+
+SCENARIO_KEYS = {"load_demand", "costs_variable", "cost_co2", "max_limits", "solver"}
+
+# Model template and solvers of the current worker process
+_worker = {}
+
+
+def scenario_grid(**axes):
+    """All combinations of the given override values, e.g. scenario_grid(cost_co2=range(10, 131, 20))"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def _init_worker(base, solver, hourly=()):
+    model = build_dispatch_model(**base, duals=True, hourly=hourly)
+    _worker["model"] = model
+    _worker["base_case"] = base
+    _worker["hourly"] = set(hourly)
+    _worker["solver"] = solver
+    _worker["solvers"] = {}
+    # Values of the mutable parameters of the base case, restored before every scenario
+    _worker["base"] = {param.local_name: param.extract_values()
+                       for param in model.component_objects(pyo.Param) if param.mutable}
+
+
+def _solver(name):
+    solvers = _worker["solvers"]
+    if name not in solvers:
+        if name.startswith("appsi_"):
+            solvers[name] = PersistentSession(_worker["model"], name)
+        else:
+            solvers[name] = pyo.SolverFactory(name)
+    return solvers[name]
+
+
+def _solve(name):
+    opt = _solver(name)
+    if isinstance(opt, PersistentSession):
+        opt.solve()
+    else:
+        opt.solve(_worker["model"], load_solutions=True)
+    return pyo.value(_worker["model"].objective)
+
+
+def _solve_scenario(scenario):
+    unknown = set(scenario) - SCENARIO_KEYS
+    if unknown:
+        raise ValueError(f"Unknown scenario overrides: {sorted(unknown)}")
+    hourly = {name for name in ("costs_variable", "max_limits")
+              if name in scenario and not accepts_mode_values(_worker["model"], name, scenario[name])}
+    if hourly:
+        _init_worker(_worker["base_case"], _worker["solver"], _worker["hourly"] | hourly)
+    model = _worker["model"]
+
+    # Start from the base case, so overrides of earlier scenarios do not carry over
+    for name, values in _worker["base"].items():
+        model.component(name).store_values(values)
+    if "load_demand" in scenario:
+        set_hour_values(model, "load_demand", scenario["load_demand"])
+    if "cost_co2" in scenario:
+        set_hour_values(model, "cost_co2", scenario["cost_co2"])
+    for name in ("costs_variable", "max_limits"):
+        if name in scenario:
+            set_mode_values(model, name, scenario[name])
+
+    objective = _solve(scenario.get("solver", _worker["solver"]))
+    dispatch = extract.dispatch_array(model)
+    co2 = extract.param_array(model, model.co2_emissions)
+    duals = extract.duals(model, model.demand_constraint)
+    return objective, dispatch, (dispatch * co2).sum(axis=1), duals
+
+
+def run_sweep(base, scenarios, solver=None, max_workers=None, chunksize=16):
+    """Solve every scenario on top of the base case and return the results as a DataFrame.
+
+    base holds the keyword arguments of models.build_dispatch_model (the task data),
+    scenarios is a list of dicts of overrides (see scenario_grid). With max_workers=1 the
+    sweep runs in the current process; solver defaults to the solver_select choice for
+    lp_dispatch. The DataFrame has one row per scenario, hour and mode with columns
+    scenario, hour, mode, power [MW], co2 [tons] (hourly total), price [EUR/MWh] (demand
+    dual) and objective [EUR], plus the scalar overrides.
+    """
+    scenarios = list(scenarios)
+    if solver is None:
+        solver = default_solver("lp_dispatch")
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    if max_workers == 1:
+        _init_worker(base, solver)
+        results = map(_solve_scenario, scenarios)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(base, solver))
+        results = executor.map(_solve_scenario, scenarios, chunksize=chunksize)
+
+    objectives, dispatches, emissions, prices = [], [], [], []
+    try:
+        for objective, dispatch, co2, duals in results:
+            objectives.append(objective)
+            dispatches.append(dispatch)
+            emissions.append(co2)
+            prices.append(duals)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    modes = list(base.get("modes") or base["costs_variable"])
+    n_scenarios, n_hours, n_modes = len(scenarios), len(base["load_demand"]), len(modes)
+    per_hour = n_modes
+    per_scenario = n_hours * n_modes
+    df = pd.DataFrame({
+        "scenario": np.repeat(np.arange(n_scenarios), per_scenario),
+        "hour": np.tile(np.repeat(np.arange(n_hours), per_hour), n_scenarios),
+        "mode": pd.Categorical(np.tile(modes, n_scenarios * n_hours), categories=modes),
+        "power": np.concatenate(dispatches).ravel() if dispatches else np.empty(0),
+        "co2": np.repeat(np.concatenate(emissions), per_hour) if emissions else np.empty(0),
+        "price": np.repeat(np.concatenate(prices), per_hour) if prices else np.empty(0),
+        "objective": np.repeat(objectives, per_scenario),
+    })
+
+    # Scalar overrides (e.g. cost_co2, solver) as columns to group by
+    for key in sorted(set().union(*scenarios) if scenarios else ()):
+        values = [scenario.get(key) for scenario in scenarios]
+        if all(np.isscalar(value) or value is None for value in values):
+            df[key] = np.repeat(values, per_scenario)
+    return df
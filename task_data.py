@@ -0,0 +1,75 @@
+"""Input data of the problem3_task*.py scripts
+
+Each TASK* dict holds the keyword arguments of the matching builder in models.py
+(build_dispatch_model, build_battery_model or build_sizing_model), with the same
+numbers as the scripts.
+"""
+
+LOAD_DEMAND = [30, 20, 20, 30, 50, 80, 100, 140, 120, 100, 90, 80, 70, 80, 120, 160, 220, 200, 180, 160, 120, 100, 80, 40]
+
+#         0   1   2   3   4   5   6   7   8   9  10  11  12  13  14  15  16  17  18  19  20  21  22  23
+WIND =  [32, 51, 19, 25, 19,  4,  2,  1,  0,  0,  0,  0,  2,  4,  9,  1, 41, 32, 14, 14, 19, 32, 32, 41]
+SOLAR = [0,   0,  0,  0,  2,  5,  8, 10, 12, 15, 18, 22, 25, 28, 30, 30, 30, 25, 20, 15, 10,  5,  0,  0]
+WIND2 = [0,   1,  0,  4,  7, 13, 21, 25, 31, 32, 41, 40, 31, 20, 14, 21, 26, 29, 42, 43, 45, 41, 40, 29]
+WIND_TASK8 = WIND[:16] + [39] + WIND[17:]  # Modified wind production in task 8
+
+TASK1 = dict(
+    load_demand=LOAD_DEMAND,
+    costs_fixed={"coal": 200, "gas": 500, "nuclear": 800, "biomass": 1000},
+    costs_variable={"coal": 60, "gas": 100, "nuclear": 120, "biomass": 150},
+    max_limits={"coal": 120, "gas": 200, "nuclear": 50, "biomass": 30},
+)
+
+TASK2 = dict(
+    load_demand=LOAD_DEMAND,
+    costs_fixed={"coal": 200, "gas": 500, "nuclear": 800, "biomass": 1000, "battery": 50},
+    costs_variable={"coal": 60, "gas": 100, "nuclear": 120, "biomass": 150, "battery": 20},
+    max_limits={"coal": 120, "gas": 200, "nuclear": 50, "biomass": 30, "battery": 25},
+    battery_rate_max=25,
+    battery_storage_max=100,
+    efficiency_ch=1.0,  # the battery of task 2 is lossless
+    efficiency_disch=1.0,
+)
+
+TASK3 = dict(
+    TASK1,
+    co2_emissions={"coal": 1.5, "gas": 0.2, "nuclear": 0, "biomass": 0},  # [tons/MWh]
+    cost_co2=60,  # [EUR/ton CO2]
+)
+
+TASK4 = dict(
+    TASK3,
+    nox_emissions={"coal": 0, "gas": 0.1, "nuclear": 0, "biomass": 0},  # [tons/MWh]
+    nox_limit=30,  # [tons]
+)
+
+TASK5 = dict(
+    TASK1,
+    costs_variable={"coal": 65, "gas": 120, "nuclear": 40, "biomass": 35},
+)
+
+TASK6 = dict(
+    load_demand=LOAD_DEMAND,
+    costs_fixed={"coal": 200, "gas": 500, "wind": 800, "solar": 1000},
+    costs_variable={"coal": 65, "gas": 120, "wind": 40, "solar": 35},
+    max_limits={"coal": 120, "gas": 200, "wind": WIND, "solar": SOLAR},
+)
+
+TASK7 = dict(
+    load_demand=LOAD_DEMAND,
+    costs_fixed={"coal": 200, "gas": 500, "wind": 800, "solar": 1000, "wind2": 800},
+    costs_variable={"coal": 65, "gas": 120, "wind": 40, "solar": 35, "wind2": 40},
+    max_limits={"coal": 120, "gas": 200, "wind": WIND, "solar": SOLAR, "wind2": WIND2},
+)
+
+TASK8 = dict(
+    TASK6,
+    max_limits={"coal": 120, "gas": 200, "wind": WIND_TASK8, "solar": SOLAR},
+)
+
+TASK9 = dict(
+    TASK7,
+    co2_emissions={"coal": 2, "gas": 0.5, "wind": 0, "solar": 0, "wind2": 0},  # [tons/MWh]
+    cost_co2=80,  # [EUR/ton CO2]
+    max_unit_counts={"coal": 1, "gas": 1, "wind": 100, "solar": 1, "wind2": 100},
+)
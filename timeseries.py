@@ -0,0 +1,100 @@
+"""Time-series inputs for load and renewable availability profiles
+
+Reads long profiles (8760 hours, 15-minute data, many sites) from CSV or Parquet in
+chunks straight into one preallocated float64 array, optionally backed by a
+memory-mapped .npy file, instead of the hard-coded 24-element lists of the task scripts.
+Every column is one series, e.g. "load", "wind", "solar", "wind2".
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class Profiles:
+    """Named profiles stored as columns of one time steps x series float64 array"""
+
+    def __init__(self, columns, data):
+        self.columns = list(columns)
+        self.data = data
+        self._position = {name: i for i, name in enumerate(self.columns)}
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __contains__(self, name):
+        return name in self._position
+
+    def __getitem__(self, name):
+        """One profile as a float64 view, no copy"""
+        return self.data[:, self._position[name]]
+
+    def max_limits(self, max_limits):
+        """Production limits with the profile of every mode that has one, else the given value.
+
+        max_limits is a dict like in the task scripts; the result can be passed on to
+        dispatch_lp.build_dispatch_lp or models.build_dispatch_model.
+        """
+        return {mode: self[mode] if mode in self else value for mode, value in max_limits.items()}
+
+
+def _count_rows(path, column, chunksize=1 << 16):
+    """Number of data rows of a CSV file, as parsed by the reader of read_profiles (so
+    blank lines and quoted line breaks do not count), reading only one column"""
+    return sum(len(chunk) for chunk in pd.read_csv(path, usecols=[column], dtype={column: np.float64},
+                                                   chunksize=chunksize))
+
+
+def _allocate(n_rows, n_columns, mmap):
+    if mmap is None:
+        return np.empty((n_rows, n_columns))
+    return np.lib.format.open_memmap(mmap, mode="w+", dtype=np.float64, shape=(n_rows, n_columns))
+
+
+def read_profiles(path, columns=None, chunksize=1 << 16, mmap=None):
+    """Read profiles from a .csv or .parquet file.
+
+    columns selects the series to read (all numeric columns by default). The file is
+    read chunksize rows at a time into one preallocated array, so the extra memory is a
+    single chunk. With mmap set to a .npy path, the array is written to that file and
+    memory-mapped, and can later be reopened with open_profiles.
+    """
+    path = os.fspath(path)
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet profiles requires pyarrow") from e
+        parquet = pq.ParquetFile(path)
+        if columns is None:
+            columns = [field.name for field in parquet.schema_arrow
+                       if pd.api.types.is_numeric_dtype(field.type.to_pandas_dtype())]
+        data = _allocate(parquet.metadata.num_rows, len(columns), mmap)
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunksize, columns=columns))
+    else:
+        if columns is None:
+            header = pd.read_csv(path, nrows=100)
+            columns = [name for name in header.columns if pd.api.types.is_numeric_dtype(header[name])]
+        data = _allocate(_count_rows(path, columns[0], chunksize), len(columns), mmap)
+        chunks = pd.read_csv(path, usecols=columns, dtype={name: np.float64 for name in columns},
+                             chunksize=chunksize)
+
+    start = 0
+    for chunk in chunks:
+        stop = start + len(chunk)
+        data[start:stop] = chunk[columns].to_numpy(dtype=np.float64)
+        start = stop
+    if start != len(data):
+        raise ValueError(f"Read {start} rows from {path}, expected {len(data)}")
+    if mmap is not None:
+        data.flush()
+        with open(mmap + ".columns", "w") as f:
+            f.write("\n".join(columns))
+    return Profiles(columns, data)
+
+
+def open_profiles(mmap):
+    """Reopen profiles written by read_profiles(..., mmap=...) without reading the source again"""
+    with open(mmap + ".columns") as f:
+        columns = f.read().split("\n")
+    return Profiles(columns, np.load(mmap, mmap_mode="r"))